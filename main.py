@@ -3,8 +3,33 @@ from tkinter import ttk, scrolledtext
 import tkinter.messagebox as messagebox
 from datetime import datetime
 from enum import Enum, auto
-from PyPDF2 import PdfMerger
-import pyautogui, json, time, os, shutil, re, pyperclip
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait as wait_futures
+from PyPDF2 import PdfMerger, PdfReader, PdfWriter
+import json, time, os, shutil, re, pyperclip, threading, queue, argparse, gzip, sqlite3, platform, hashlib, tempfile
+import sys, io, cProfile, pstats, collections, subprocess, itertools, csv, random, ctypes, atexit, stat
+from contextlib import contextmanager
+from types import MappingProxyType
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import urllib.request
+try:
+    import pyautogui
+except Exception:  # 화면이 없는 환경에서는 가상 백엔드(SimulatedBackend)만 사용 가능
+    pyautogui = None
+
+try:
+    import win32print
+except ImportError:  # pywin32가 없으면 기본 프린터는 PowerShell/lpstat으로 조회
+    win32print = None
+
+try:
+    import pikepdf
+except ImportError:  # 없으면 PDF 최적화는 PyPDF2로 콘텐츠 스트림 압축만 수행
+    pikepdf = None
+
+try:
+    import psutil
+except ImportError:  # 없으면 soak 모드의 메모리/핸들 수는 /proc(리눅스)에서만 읽음
+    psutil = None
 
 class WordbookType(Enum):
     ORIGINAL = "원래순서"
@@ -28,31 +53,163 @@ class ProgramState(Enum):
     RUNNING = auto()   # 실행 중
     PAUSED = auto()    # 일시정지
 
+class UiDispatcher:
+    """다른 스레드의 Tk 호출을 메인 스레드로 넘기는 클래스
+
+    Tk는 스레드 안전하지 않으므로 메인 스레드가 아니면 호출을 대기열에 넣고, 메인 스레드가
+    root.after로 주기적으로 꺼내 실행한다. root가 없으면(UI 없이 실행) 바로 호출한다.
+    """
+    POLL_MS = 50
+
+    def __init__(self, root=None):
+        self.root = root
+        self.calls = queue.Queue()
+        if root:
+            root.after(self.POLL_MS, self._poll)
+
+    def on_ui_thread(self):
+        return self.root is None or threading.current_thread() is threading.main_thread()
+
+    def post(self, func, *args):
+        """func(*args)를 메인 스레드에서 실행 (기다리지 않음)"""
+        if self.on_ui_thread():
+            func(*args)
+        else:
+            self.calls.put((func, args, None))
+
+    def call(self, func, *args):
+        """func(*args)를 메인 스레드에서 실행하고 결과를 기다려 반환"""
+        if self.on_ui_thread():
+            return func(*args)
+        result = {'done': threading.Event()}
+        self.calls.put((func, args, result))
+        result['done'].wait()
+        if 'error' in result:
+            raise result['error']
+        return result.get('value')
+
+    def _poll(self):
+        while True:
+            try:
+                func, args, result = self.calls.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                value = func(*args)
+                if result is not None:
+                    result['value'] = value
+            except Exception as e:
+                if result is None:
+                    print(f"UI 호출 중 오류: {e}")
+                else:
+                    result['error'] = e
+            if result is not None:
+                result['done'].set()
+        self.root.after(self.POLL_MS, self._poll)
+
 # 컨트롤러 클래스
 class Controller:
-    def __init__(self, root: tk.Tk):
+    def __init__(self, root: tk.Tk = None, backend=None):
         self.state = ProgramState.IDLE
         
-        # 자식 컴포넌트 초기화
-        self.debug_window = DebugWindow(self) if Config.is_debug_mode() else None            
-        self.view = AppUI(root, self)
+        # 실시간 카운터/게이지 (config의 metrics_port가 있으면 HTTP로 제공)
+        self.metrics = Metrics()
+        self.metrics.set('state', 1, state=self.state.name)
+        self.metrics_server = None
+        if Config.get_value('metrics_port'):
+            try:
+                self.metrics_server = MetricsServer(self.metrics, Config.get_value('metrics_host') or "127.0.0.1",
+                                                    Config.get_value('metrics_port'))
+            except OSError as e:
+                print(f"메트릭 서버를 시작할 수 없습니다: {e}")
+        
+        # 작업 스레드(대기열 실행 등)의 UI/클립보드 호출은 메인 스레드로 넘긴다
+        self.ui = UiDispatcher(root)
+        
+        # GUI 조작 백엔드 (기본값: pyautogui로 실제 화면 조작)
+        self.backend = backend or PyAutoGuiBackend(root, self.ui)
+        if backend is None and Config.get_value('record_trace'):
+            os.makedirs("traces", exist_ok=True)
+            trace_path = os.path.join("traces", datetime.now().strftime('%Y%m%d_%H%M%S') + ".jsonl.gz")
+            self.backend = RecordingBackend(self.backend, trace_path)
+            # gzip 트레이스는 닫아야 끝 표시가 써지므로 창을 닫거나 프로세스가 끝날 때 닫는다
+            atexit.register(self.backend.close)
+        self.backend = MeteredBackend(self.backend, self.metrics)
+        
+        # 디버그 창에서 켜는 프로파일러 (꺼져 있으면 측정하지 않음)
+        self.profiler = Profiler()
+        
+        # 자식 컴포넌트 초기화 (root가 없으면 UI 없이 실행)
+        self.debug_window = DebugWindow(self) if root and Config.is_debug_mode() else None            
+        self.view = AppUI(root, self) if root else None
+        self.sessions = SessionTracker(self)
         self.macro = MacroController(self)
         self.pdf_manager = PDFManager(self)
+        self.preflight = Preflight(self)
+        self.renderer = NativeRenderer(self)
+        self.scheduler = JobScheduler(self)
+        self.history = RunHistory(Config.get_value('history_db') or "history.sqlite3")
+        if root:
+            root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         print("Controller initialized.")
         
-        appdata_path = os.getenv('APPDATA')
+        appdata_path = os.getenv('APPDATA') or os.path.expanduser('~')
         
         # 컨트롤러에서 관리할 데이터나 기능 초기화
         self.directories = {
             "Work": "work",
             "Output": "output",
-            "Answer": os.path.join(appdata_path, 'FactoryVoca Pro', '정답')
+            "Answer": os.path.join(appdata_path, 'FactoryVoca Pro', '정답'),
+            "Staging": "staging"
         }
                 
+        self.select_staging_root()
         self.initialize_directories()
-        self.delete_work_contents()
-        self.delete_answer_sheet_contents()
+        if self.view:
+            self.delete_work_contents()
+            self.delete_answer_sheet_contents()
+
+    def on_close(self):
+        """메인 창을 닫을 때 동작 기록을 마무리하고 종료"""
+        close = getattr(self.backend, 'close', None)
+        if close:
+            close()
+        self.view.root.destroy()
+
+    def select_staging_root(self, day_count=0):
+        """Day PDF 작업 폴더와 답지 스테이징 폴더를 RAM 디스크에 둘 수 있으면 그쪽으로 설정
+
+        config의 staging.ram_dir(tmpfs, RAM 디스크 등)에 min_free_mb + Day 수 x day_size_mb 만큼
+        여유 공간이 없으면 디스크의 work/staging 폴더를 사용한다.
+        """
+        staging = Config.get_value('staging') or {}
+        ram_dir = staging.get('ram_dir')
+        if ram_dir == 'auto':
+            ram_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+        work_folder, staging_folder = "work", "staging"
+        if ram_dir:
+            required_mb = staging.get('min_free_mb', 256) + day_count * staging.get('day_size_mb', 2)
+            try:
+                free_mb = shutil.disk_usage(ram_dir).free / (1024 * 1024)
+            except OSError as e:
+                self.log(f"RAM 스테이징 폴더를 사용할 수 없습니다: {ram_dir} - {str(e)}")
+                free_mb = 0
+            if free_mb >= required_mb:
+                root = os.path.join(ram_dir, "AutoTestCrafter")
+                work_folder = os.path.join(root, "work")
+                staging_folder = os.path.join(root, "staging")
+            elif free_mb:
+                self.log(f"RAM 스테이징 폴더 여유 공간 부족 ({free_mb:.0f}MB < {required_mb}MB), 디스크를 사용합니다.")
+
+        if work_folder != self.directories["Work"]:
+            # 작업 폴더가 바뀌면 FactoryVoca의 출력 경로는 세션 상태와 달라지므로 다음 출력 때 다시 설정된다
+            self.log(f"작업 폴더: {os.path.abspath(work_folder)}")
+        self.directories["Work"] = work_folder
+        self.directories["Staging"] = staging_folder
+        os.makedirs(work_folder, exist_ok=True)
+        os.makedirs(staging_folder, exist_ok=True)
 
     def initialize_directories(self):
         """폴더가 없으면 생성하는 메서드"""
@@ -139,7 +296,7 @@ class Controller:
         log_message = f"[{current_time}] {message}"
         print(log_message)  # 항상 콘솔에 출력
         if self.debug_window:  # 디버그 모드일 경우 디버그 콘솔에도 출력
-            self.debug_window.log(message)
+            self.ui.post(self.debug_window.log, message)
             
     def debug_log(self, message):
         """디버그 로그 출력"""
@@ -165,8 +322,10 @@ class Controller:
 
     def set_state(self, new_state: ProgramState):
         """상태 변경 및 UI 업데이트"""
+        self.metrics.set('state', 0, state=self.state.name)
+        self.metrics.set('state', 1, state=new_state.name)
         self.state = new_state
-        self.update_ui_for_state()
+        self.ui.post(self.update_ui_for_state)
 
     def update_ui_for_state(self):
         """현재 상태에 따라 UI 업데이트"""
@@ -196,6 +355,37 @@ class Controller:
         }
         self.view.status_label.configure(text=status_texts[self.state])
 
+    def report_progress(self, current_day, done, total, started_at, wordbook_type):
+        """진행 상황(현재 Day, 분당 Day 수, 예상 남은 시간)을 계산해서 UI에 표시"""
+        elapsed = time.time() - started_at
+        days_per_minute = done / elapsed * 60 if done and elapsed > 0 else 0.0
+
+        # 이번 실행의 평균과 이 PC/유형의 최근 기록을 섞어서 Day당 소요 시간 추정
+        history_seconds = self.history.average_day_seconds(platform.node(), wordbook_type)
+        current_seconds = elapsed / done if done else None
+        if current_seconds and history_seconds:
+            weight = min(done, 10) / 10
+            day_seconds = current_seconds * weight + history_seconds * (1 - weight)
+        else:
+            day_seconds = current_seconds or history_seconds
+        eta_seconds = (total - done) * day_seconds if day_seconds else None
+
+        self.metrics.set('current_day', current_day)
+        self.metrics.set('job_days_done', done)
+        self.metrics.set('job_days_total', total)
+        if eta_seconds is not None:
+            self.metrics.set('job_eta_seconds', eta_seconds)
+
+        if self.view:
+            self.ui.post(self.view.update_progress, current_day, done, total, days_per_minute, eta_seconds)
+
+    def show_error(self, title, message):
+        """오류 메시지 상자 (UI 없이 실행하면 로그로)"""
+        if self.view:
+            self.ui.post(messagebox.showerror, title, message)
+        else:
+            self.log(f"{title}: {message}")
+
 # UI 클래스
 class AppUI:
     def __init__(self, root: tk.Tk, controller: Controller):
@@ -203,7 +393,7 @@ class AppUI:
         self.controller = controller
 
         self.root.title("AutoTestCrafter")  # 창 제목
-        self.root.geometry("400x500")    # 창 크기 설정 (너비 x 높이)
+        self.root.geometry("400x650")    # 창 크기 설정 (너비 x 높이)
 
         # UI 요소 구성
         self.create_widgets()
@@ -298,15 +488,8 @@ class AppUI:
         # 체크박스들을 저장할 딕셔너리
         self.checkboxes = {}
         
-        # 체크리스트 항목들
-        checklist_items = [
-            "첫페이지 제목(ex. 랜덤ver1) 설정하기",
-            "기본 프린터 PDF로 설정하기",
-            "추가기능 -> 날짜 설정에서 빈칸으로 설정하기",
-            "엑셀 인쇄 페이지 크기 맞추기",
-            "단어장 검색해서 설정하기",
-            "'첫단어에 유닛이름 표시' 해제하기"
-        ]
+        # 체크리스트 항목들 (Preflight가 자동으로 확인할 수 있는 항목은 자동 체크)
+        checklist_items = list(Preflight.ITEMS.values())
         
         # 체크박스 변수들을 저장할 딕셔너리
         self.checkbox_vars = {}
@@ -327,6 +510,8 @@ class AppUI:
             checkbox.pack(anchor="w", padx=10, pady=2)
             self.checkboxes[item] = checkbox
 
+        ttk.Button(self.checklist_frame, text="자동 확인",
+                   command=lambda: self.run_preflight(force=True)).pack(anchor="e", padx=10, pady=2)
         
 
         # 버튼 프레임
@@ -382,11 +567,122 @@ class AppUI:
         # 초기 버튼 상태 설정
         self.buttons['pause'].configure(state='disabled')
         self.buttons['stop'].configure(state='disabled')
+        
+        ttk.Button(self.button_frame, text="작업 대기열...", 
+                   command=self.show_queue_window).pack(pady=(0, 5))
 
         # 상태 표시 레이블
         self.status_label = ttk.Label(self.root, text="상태: 대기 중")
         self.status_label.pack(pady=5)
 
+        # 진행 상황 프레임
+        self.progress_frame = ttk.LabelFrame(self.root, text="진행 상황")
+        self.progress_frame.pack(pady=5, padx=20, fill="x")
+
+        self.progress_bar = ttk.Progressbar(self.progress_frame, mode="determinate")
+        self.progress_bar.pack(fill="x", padx=10, pady=5)
+
+        self.progress_labels = {}
+        for name, text in [('day', "현재: -"), ('speed', "속도: -"), ('eta', "예상 남은 시간: -")]:
+            self.progress_labels[name] = ttk.Label(self.progress_frame, text=text)
+            self.progress_labels[name].pack(anchor="w", padx=10)
+
+    def show_queue_window(self):
+        """우선순위/마감이 있는 작업 대기열 창 표시"""
+        queue_window = tk.Toplevel(self.root)
+        queue_window.title("작업 대기열")
+        queue_window.geometry("560x320")
+        scheduler = self.controller.scheduler
+        
+        columns = ("id", "name", "days", "priority", "deadline", "eta", "status")
+        headings = ("번호", "단어장", "범위", "우선순위", "마감", "예상 완료", "상태")
+        tree = ttk.Treeview(queue_window, columns=columns, show="headings", height=8)
+        for column, heading in zip(columns, headings):
+            tree.heading(column, text=heading)
+            tree.column(column, width=50 if column in ("id", "priority") else 80, anchor="center")
+        tree.pack(padx=10, pady=5, fill="both", expand=True)
+        
+        # 현재 입력값을 우선순위/마감과 함께 추가
+        add_frame = ttk.Frame(queue_window)
+        add_frame.pack(padx=10, pady=5, fill="x")
+        ttk.Label(add_frame, text="우선순위:").pack(side="left")
+        priority = ttk.Spinbox(add_frame, from_=0, to=9, width=3)
+        priority.set(0)
+        priority.pack(side="left", padx=5)
+        ttk.Label(add_frame, text="마감(HH:MM):").pack(side="left")
+        deadline = ttk.Entry(add_frame, width=16)
+        deadline.pack(side="left", padx=5)
+        
+        def format_time(timestamp):
+            return datetime.fromtimestamp(timestamp).strftime('%m-%d %H:%M') if timestamp else "-"
+        
+        def refresh():
+            if not queue_window.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            predicted = {job.id: (eta, late) for job, eta, late in scheduler.predict()}
+            for job in scheduler.jobs:
+                eta, late = predicted.get(job.id, (None, False))
+                values = job.input_values
+                tree.insert("", "end", values=(
+                    job.id, values['name'], f"{values['day_start']}-{values['day_end']}", job.priority,
+                    format_time(job.deadline), format_time(eta) + (" (지연)" if late else ""), job.status))
+            queue_window.after(5000, refresh)
+        
+        def add_job():
+            if not self.validate_inputs():
+                return
+            try:
+                job_deadline = parse_deadline(deadline.get())
+                job_priority = int(priority.get())
+            except ValueError as e:
+                messagebox.showerror("오류", str(e), parent=queue_window)
+                return
+            scheduler.submit(self.get_input_values(), job_priority, job_deadline)
+            refresh()
+        
+        def run_queue():
+            if scheduler.running:
+                return
+            if not self.run_preflight() or not self.validate_checklist():
+                return
+            self.start_scheduler()
+        
+        ttk.Button(add_frame, text="추가", command=add_job).pack(side="left", padx=5)
+        ttk.Button(add_frame, text="대기열 실행", command=run_queue).pack(side="right", padx=5)
+        refresh()
+
+    def start_scheduler(self):
+        """대기열을 백그라운드 스레드에서 실행 (이미 실행 중이면 그 스레드가 새 작업도 이어서 실행)"""
+        scheduler = self.controller.scheduler
+        if scheduler.running:
+            return
+        self.controller.set_state(ProgramState.RUNNING)
+        
+        def run():
+            try:
+                scheduler.run()
+            finally:
+                self.controller.set_state(ProgramState.IDLE)
+                self.controller.ui.post(self.enable_inputs)
+        # 실행 중에도 급한 작업을 추가할 수 있도록 별도 스레드에서 실행
+        threading.Thread(target=run, daemon=True).start()
+
+    def update_progress(self, current_day, done, total, days_per_minute, eta_seconds):
+        """진행 상황 패널 갱신"""
+        self.progress_bar.configure(maximum=max(total, 1), value=done)
+        self.progress_labels['day'].configure(text=f"현재: Day {current_day} ({done}/{total} 완료)")
+        self.progress_labels['speed'].configure(text=f"속도: 분당 {days_per_minute:.1f} Day")
+        if eta_seconds is None:
+            eta_text = "예상 남은 시간: -"
+        else:
+            minutes, seconds = divmod(int(eta_seconds), 60)
+            hours, minutes = divmod(minutes, 60)
+            eta_text = f"예상 남은 시간: {hours}시간 {minutes}분 {seconds}초"
+        self.progress_labels['eta'].configure(text=eta_text)
+        # 매크로가 메인 스레드에서 도는 동안에도 화면에 반영
+        self.root.update_idletasks()
+
     def get_input_values(self):
         """순수 입력값만 반환"""
         values = {
@@ -458,6 +754,22 @@ class AppUI:
             self.inputs['version'].configure(state="normal")
     
 
+    def run_preflight(self, force=False):
+        """자동으로 확인할 수 있는 항목을 검사해 체크하고, 실패한 항목이 없으면 True 반환"""
+        results = self.controller.preflight.run(force)
+        failed = []
+        for item_id, (ok, detail) in results.items():
+            label = Preflight.ITEMS[item_id]
+            if ok:
+                self.checkbox_vars[label].set(True)
+            elif ok is False:
+                self.checkbox_vars[label].set(False)
+                failed.append(f"- {label}: {detail}")
+        if failed:
+            messagebox.showwarning("사전 점검 실패", "다음 항목을 확인해 주세요:\n\n" + "\n".join(failed))
+            return False
+        return True
+
     def validate_checklist(self):
         """모든 항목이 체크되었는지 확인"""
         unchecked = [item for item, var in self.checkbox_vars.items() if not var.get()]
@@ -483,18 +795,19 @@ class AppUI:
         if not self.validate_inputs():
             return
         
-        # 확인사항 검증
-        if not self.validate_checklist():
-            return
+        # 확인사항 검증 (자동 확인 후 남은 항목만 사람이 체크, 직접 출력하면 FactoryVoca를 쓰지 않으므로 생략)
+        if Config.get_value('engine') != 'native':
+            if not self.run_preflight():
+                return
+            if not self.validate_checklist():
+                return
         
         # 입력 필드 비활성화
         self.disable_inputs()
         
-        # 상태 변경
-        self.controller.set_state(ProgramState.RUNNING)
-        
-        # 매크로 시작
-        self.controller.macro.start_macro()
+        # 대기열에 넣어 대기열 실행과 같은 스레드에서 실행 (급한 작업이 들어오면 Day 경계에서 멈춤)
+        self.controller.scheduler.submit(self.get_input_values())
+        self.start_scheduler()
         self.log("작업 시작")
 
     def on_pause_click(self):
@@ -513,13 +826,476 @@ class AppUI:
         # TODO: 실제 중단 로직 구현
         self.log("작업 중단")
 
+class Metrics:
+    """Prometheus 텍스트/JSON으로 내보낼 수 있는 카운터, 게이지, 히스토그램 모음
+
+    값 하나 갱신은 잠금 안에서 dict 갱신 한 번이므로 매크로 실행에는 영향이 거의 없다.
+    """
+    PREFIX = "autotestcrafter_"
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+    HELP = {
+        'state': ("gauge", "프로그램 상태 (현재 상태만 1)"),
+        'current_day': ("gauge", "지금 출력 중인 Day"),
+        'job_days_done': ("gauge", "현재 작업에서 끝난 Day 수"),
+        'job_days_total': ("gauge", "현재 작업의 전체 Day 수"),
+        'job_eta_seconds': ("gauge", "현재 작업의 예상 남은 시간"),
+        'days_completed_total': ("counter", "출력을 마친 Day 수"),
+        'reprints_total': ("counter", "검사 실패로 다시 출력한 횟수"),
+        'window_enumerations_total': ("counter", "창 목록 조회 횟수"),
+        'output_bytes_total': ("counter", "병합해서 쓴 PDF 크기 합계"),
+        'step_seconds': ("histogram", "Day 단계별 소요 시간"),
+        'merge_seconds': ("histogram", "병합 소요 시간"),
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}       # (이름, 라벨) -> 값
+        self.histograms = {}   # (이름, 라벨) -> [버킷별 개수..., 합계, 개수]
+        # 라벨 없는 카운터는 0부터 보이도록 미리 등록
+        for name, (metric_type, _) in self.HELP.items():
+            if metric_type == "counter" and name != 'window_enumerations_total':
+                self.values[(name, ())] = 0
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.values[self._key(name, labels)] = value
+
+    def total(self, name):
+        """라벨에 상관없이 name 값의 합계"""
+        with self.lock:
+            return sum(value for (key_name, _), value in self.values.items() if key_name == name)
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(self.BUCKETS) + 2)
+            for index, bound in enumerate(self.BUCKETS):
+                if value <= bound:
+                    histogram[index] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+    def render_prometheus(self):
+        with self.lock:
+            values = dict(self.values)
+            histograms = {key: list(histogram) for key, histogram in self.histograms.items()}
+        lines = []
+        names = sorted({name for name, _ in values} | {name for name, _ in histograms})
+        for name in names:
+            metric_type, help_text = self.HELP.get(name, ("gauge", name))
+            full_name = self.PREFIX + name
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {metric_type}")
+            for (key_name, labels), value in sorted(values.items()):
+                if key_name == name:
+                    lines.append(f"{full_name}{self._labels(labels)} {value}")
+            for (key_name, labels), histogram in sorted(histograms.items()):
+                if key_name != name:
+                    continue
+                for bound, count in zip(self.BUCKETS, histogram):
+                    lines.append(f"{full_name}_bucket{self._labels(labels, [('le', bound)])} {count}")
+                lines.append(f"{full_name}_bucket{self._labels(labels, [('le', '+Inf')])} {histogram[-1]}")
+                lines.append(f"{full_name}_sum{self._labels(labels)} {histogram[-2]}")
+                lines.append(f"{full_name}_count{self._labels(labels)} {histogram[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def to_json(self):
+        with self.lock:
+            return {
+                'values': [{'name': name, 'labels': dict(labels), 'value': value}
+                           for (name, labels), value in sorted(self.values.items())],
+                'histograms': [{'name': name, 'labels': dict(labels), 'buckets': dict(zip(self.BUCKETS, histogram)),
+                                'sum': histogram[-2], 'count': histogram[-1]}
+                               for (name, labels), histogram in sorted(self.histograms.items())]
+            }
+
+class MetricsServer:
+    """Metrics를 /metrics (Prometheus 텍스트)와 /metrics.json으로 제공하는 백그라운드 HTTP 서버"""
+    def __init__(self, metrics, host="127.0.0.1", port=9477):
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = metrics.render_prometheus().encode('utf-8'), "text/plain; version=0.0.4; charset=utf-8"
+                elif self.path == "/metrics.json":
+                    body, content_type = json.dumps(metrics.to_json(), ensure_ascii=False).encode('utf-8'), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class RunHistory:
+    """작업과 Day/단계별 소요 시간을 저장하는 로컬 SQLite 기록
+
+    ETA 계산과 PC/설정 버전별 비교 보고서에 사용한다.
+    """
+    def __init__(self, db_path="history.sqlite3"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    machine TEXT, wordbook_type TEXT, name TEXT, version TEXT,
+                    day_start INTEGER, day_end INTEGER, config_version TEXT,
+                    started_at REAL, finished_at REAL, status TEXT
+                );
+                CREATE TABLE IF NOT EXISTS step_timings (
+                    job_id INTEGER, day INTEGER, step TEXT, duration REAL, recorded_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_step_timings_job ON step_timings (job_id, step);
+            """)
+
+    def start_job(self, input_values):
+        """작업 시작 기록 후 작업 id 반환"""
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO jobs (machine, wordbook_type, name, version, day_start, day_end,"
+                " config_version, started_at, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'running')",
+                (platform.node(), input_values['type'].value, input_values['name'], input_values['version'],
+                 int(input_values['day_start']), int(input_values['day_end']), Config.get_version(), time.time()))
+            return cursor.lastrowid
+
+    def finish_job(self, job_id, status):
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE jobs SET finished_at = ?, status = ? WHERE id = ?",
+                              (time.time(), status, job_id))
+
+    def record_step(self, job_id, day, step, duration):
+        """Day의 한 단계('navigate', 'print', 'day' 등) 소요 시간 기록"""
+        with self._lock, self.conn:
+            self.conn.execute("INSERT INTO step_timings VALUES (?, ?, ?, ?, ?)",
+                              (job_id, day, step, duration, time.time()))
+
+    def average_day_seconds(self, machine, wordbook_type, limit=50):
+        """이 PC와 유형의 최근 Day 소요 시간 평균 (기록이 없으면 None)"""
+        with self._lock:
+            row = self.conn.execute("""
+                SELECT AVG(duration) FROM (
+                    SELECT t.duration FROM step_timings t JOIN jobs j ON j.id = t.job_id
+                    WHERE t.step = 'day' AND j.machine = ? AND j.wordbook_type = ?
+                    ORDER BY t.recorded_at DESC LIMIT ?)
+            """, (machine, wordbook_type.value, limit)).fetchone()
+        return row[0]
+
+    def report(self):
+        """PC/설정 버전/유형별 작업 수, Day 수와 단계별 평균 소요 시간"""
+        with self._lock:
+            return self.conn.execute("""
+                SELECT j.machine, j.config_version, j.wordbook_type, t.step,
+                       COUNT(DISTINCT j.id), COUNT(*), AVG(t.duration), MIN(t.duration), MAX(t.duration)
+                FROM step_timings t JOIN jobs j ON j.id = t.job_id
+                GROUP BY j.machine, j.config_version, j.wordbook_type, t.step
+                ORDER BY j.machine, j.config_version, j.wordbook_type, t.step
+            """).fetchall()
+
+@contextmanager
+def atomic_output(output_path):
+    """출력 폴더 안의 임시 파일에 쓴 뒤 이름을 바꿔서 한 번에 공개하는 파일 객체
+
+    쓰는 도중에 실패해도 반쯤 쓴 파일이 output_path에 남지 않는다. output_path를 읽으면서
+    같은 경로에 쓸 때는 읽는 쪽을 with 블록 안에서 닫아야 한다 (윈도우는 열린 파일을 바꿀 수 없음).
+    mkstemp는 0600으로 만들므로 교체 전에 기존 파일의 권한으로, 새 파일이면 출력 폴더의 권한에서
+    실행 비트를 뺀 권한으로 바꾼다 (umask는 읽으려면 프로세스 전체 값을 바꿔야 하므로 쓰지 않음).
+    """
+    folder = os.path.dirname(output_path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+        try:
+            mode = stat.S_IMODE(os.stat(output_path).st_mode)
+        except FileNotFoundError:
+            mode = stat.S_IMODE(os.stat(folder).st_mode) & 0o666
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+def parse_day_ranges(text):
+    """'1-5,8,10-12' 같은 Day 범위 문자열을 Day 번호 목록으로 변환"""
+    days = []
+    for part in str(text).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = (int(value) for value in part.split('-', 1))
+            days.extend(range(start, end + 1))
+        else:
+            days.append(int(part))
+    return days
+
+class MergePlan:
+    """여러 출력 PDF를 한 번에 만드는 병합 계획
+
+    소스 PDF는 키(예: ('work', 3))로 경로나 파일 객체를 등록하고, 출력마다 (소스 키, 페이지 목록) 항목을 원하는
+    순서대로 나열한다 (페이지 목록이 None이면 전체). execute()는 각 소스를 한 번만 파싱하고
+    그 페이지를 필요한 모든 출력에 나눠준다.
+    """
+    def __init__(self):
+        self.sources = {}
+        self.outputs = []
+        self.missing = {}   # 출력 경로 -> 소스가 없어 빠진 키 목록
+
+    def add_source(self, key, pdf_path):
+        self.sources[key] = pdf_path
+
+    def add_output(self, output_path, items):
+        """출력 추가. 등록되지 않은 소스 키는 건너뛰고 missing에 남긴다"""
+        missing = [key for key, _ in items if key not in self.sources]
+        if missing:
+            self.missing[output_path] = missing
+        items = [(key, pages) for key, pages in items if key in self.sources]
+        if items:
+            self.outputs.append((output_path, items))
+
+    def execute(self):
+        """모든 출력을 만들고 {출력 경로: 페이지 수}를 반환
+
+        출력마다 Day별 페이지 범위 책갈피를 달고 옆에 인덱스 파일(MergedBook)을 남긴다.
+        """
+        readers = {}
+        hashes = {}
+
+        def entry_of(key, first_page, last_page):
+            if key not in hashes:
+                hashes[key] = hash_source(self.sources[key])
+            kind, day = key
+            return {'day': day, 'kind': kind, 'first_page': first_page + 1, 'last_page': last_page,
+                    'sha256': hashes[key]}
+
+        def pages_of(key, pages):
+            if key not in readers:
+                readers[key] = PdfReader(self.sources[key], strict=False)
+            reader_pages = readers[key].pages
+            if pages is None:
+                return list(reader_pages)
+            return [reader_pages[index] for index in pages]
+
+        results = {}
+        for output_path, items in self.outputs:
+            writer = PdfWriter()
+            entries = []
+            for key, pages in items:
+                first_page = len(writer.pages)
+                for page in pages_of(key, pages):
+                    writer.add_page(page)
+                entries.append(entry_of(key, first_page, len(writer.pages)))
+            MergedBook.add_outline(writer, entries)
+            with atomic_output(output_path) as f:
+                writer.write(f)
+            MergedBook(output_path).save_index(entries)
+            results[output_path] = len(writer.pages)
+        return results
+
+def hash_source(source):
+    """경로 또는 파일 객체 내용의 SHA-256"""
+    if hasattr(source, 'getvalue'):
+        return hashlib.sha256(source.getvalue()).hexdigest()
+    digest = hashlib.sha256()
+    with open(source, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class MergedBook:
+    """병합된 PDF와 옆에 저장된 인덱스(<이름>.index.json)
+
+    인덱스에는 Day별 페이지 범위(1부터, 끝 포함)와 원본 Day PDF의 해시가 들어 있어서,
+    Day별 파일이 정리된 뒤에도 병합본에서 일부 Day를 뽑거나 한 Day만 바꿔 넣을 수 있다.
+    """
+    KIND_LABELS = {'work': "", 'answer': " 답지", 'placeholder': " 답지 (없음)"}
+
+    def __init__(self, pdf_path):
+        self.pdf_path = pdf_path
+        self.index_path = os.path.splitext(pdf_path)[0] + ".index.json"
+
+    @classmethod
+    def add_outline(cls, writer, entries):
+        """Day별 첫 페이지에 책갈피 추가"""
+        for entry in entries:
+            if entry['last_page'] >= entry['first_page']:
+                title = f"Day {entry['day']}{cls.KIND_LABELS.get(entry['kind'], '')}"
+                writer.add_outline_item(title, entry['first_page'] - 1)
+
+    def save_index(self, entries):
+        index = {
+            'book': os.path.basename(self.pdf_path),
+            'pages': entries[-1]['last_page'] if entries else 0,
+            'entries': entries
+        }
+        with atomic_output(self.index_path) as f:
+            f.write(json.dumps(index, ensure_ascii=False, indent=2).encode('utf-8'))
+
+    def load_index(self):
+        if not os.path.exists(self.index_path):
+            raise ValueError(f"인덱스 파일이 없습니다: {self.index_path}")
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def open(self):
+        """병합본과 인덱스를 읽고 페이지 수가 맞는지 확인"""
+        index = self.load_index()
+        reader = PdfReader(self.pdf_path, strict=False)
+        if len(reader.pages) != index['pages']:
+            raise ValueError(f"병합본 페이지 수({len(reader.pages)})가 인덱스({index['pages']})와 다릅니다")
+        return reader, index['entries']
+
+    def extract(self, days, output_path):
+        """days에 해당하는 페이지만 병합본 순서대로 뽑아 새 PDF로 저장 (Day별 원본 불필요)"""
+        reader, entries = self.open()
+        days = set(days)
+        selected = [entry for entry in entries if entry['day'] in days]
+        if not selected:
+            raise ValueError("병합본에 해당 Day가 없습니다")
+        writer, new_entries = self._copy(reader, selected)
+        with atomic_output(output_path) as f:
+            writer.write(f)
+        MergedBook(output_path).save_index(new_entries)
+        return new_entries
+
+    def replace_day(self, day, pdf_path, kind=None):
+        """한 Day의 페이지를 pdf_path로 바꾸고 병합본과 인덱스를 제자리에서 갱신"""
+        reader, entries = self.open()
+        targets = [entry for entry in entries if entry['day'] == day and kind in (None, entry['kind'])]
+        if len(targets) != 1:
+            raise ValueError(f"Day {day} 항목이 {len(targets)}개입니다 (--kind로 지정)" if targets
+                             else f"병합본에 Day {day}가 없습니다")
+        replacement = PdfReader(pdf_path, strict=False)
+        writer, new_entries = self._copy(reader, entries, {id(targets[0]): (replacement, hash_source(pdf_path))})
+        with atomic_output(self.pdf_path) as f:
+            writer.write(f)
+        self.save_index(new_entries)
+        return new_entries
+
+    @classmethod
+    def _copy(cls, reader, entries, replacements=None):
+        """entries 순서대로 페이지를 복사한 writer와 새 인덱스 항목 반환"""
+        replacements = replacements or {}
+        writer = PdfWriter()
+        new_entries = []
+        for entry in entries:
+            first_page = len(writer.pages)
+            if id(entry) in replacements:
+                source, sha256 = replacements[id(entry)]
+                pages = source.pages
+            else:
+                sha256 = entry['sha256']
+                pages = reader.pages[entry['first_page'] - 1:entry['last_page']]
+            for page in pages:
+                writer.add_page(page)
+            new_entries.append({**entry, 'first_page': first_page + 1, 'last_page': len(writer.pages),
+                                'sha256': sha256})
+        cls.add_outline(writer, new_entries)
+        return writer, new_entries
+
+def measure_first_page(pdf_path):
+    """파일을 열어 첫 페이지 내용을 읽을 때까지 걸린 시간(초)"""
+    start_time = time.perf_counter()
+    reader = PdfReader(pdf_path, strict=False)
+    if reader.pages:
+        reader.pages[0].get_contents()
+    return time.perf_counter() - start_time
+
+class PdfOptimizer:
+    """병합이 끝난 PDF를 압축/선형화하는 후처리 단계
+
+    pikepdf가 있으면 콘텐츠 스트림 압축, 오브젝트 스트림 생성, 사용하지 않는 리소스 제거와
+    선형화(빠른 웹 보기)를 한 번에 처리한다. 없으면 PyPDF2로 콘텐츠 스트림만 압축한다.
+    작업 스레드 하나에서 실행되므로 다음 작업을 막지 않는다.
+    """
+    def __init__(self, controller):
+        self.controller = controller
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-optimize")
+        self.futures = []
+
+    def submit(self, pdf_paths):
+        futures = [self.executor.submit(self.optimize, pdf_path) for pdf_path in pdf_paths]
+        self.futures.extend(futures)
+        return futures
+
+    def wait(self):
+        """제출된 최적화가 모두 끝날 때까지 대기"""
+        futures, self.futures = self.futures, []
+        wait_futures(futures)
+
+    def optimize(self, pdf_path):
+        """pdf_path를 최적화한 파일로 교체하고 전후 크기/첫 페이지 시간을 반환"""
+        try:
+            before_size = os.path.getsize(pdf_path)
+            before_time = measure_first_page(pdf_path)
+            if pikepdf is not None:
+                # 원본을 닫은 뒤에 교체해야 한다 (윈도우는 열려 있는 파일을 바꿀 수 없음)
+                with atomic_output(pdf_path) as f:
+                    with pikepdf.open(pdf_path) as pdf:
+                        pdf.remove_unreferenced_resources()
+                        pdf.save(f, linearize=True, compress_streams=True,
+                                 object_stream_mode=pikepdf.ObjectStreamMode.generate)
+            else:
+                reader = PdfReader(pdf_path, strict=False)
+                writer = PdfWriter()
+                writer.clone_document_from_reader(reader)  # 책갈피 유지
+                for page in writer.pages:
+                    page.compress_content_streams()
+                with atomic_output(pdf_path) as f:
+                    writer.write(f)
+            after_size = os.path.getsize(pdf_path)
+            after_time = measure_first_page(pdf_path)
+        except Exception as e:
+            self.controller.log(f"PDF 최적화 실패 ({os.path.basename(pdf_path)}): {e}")
+            return None
+
+        self.controller.log(
+            f"PDF 최적화: {os.path.basename(pdf_path)} "
+            f"{before_size / 1024:.0f}KB → {after_size / 1024:.0f}KB, "
+            f"첫 페이지 {before_time * 1000:.0f}ms → {after_time * 1000:.0f}ms"
+        )
+        return {'path': pdf_path, 'before_size': before_size, 'after_size': after_size,
+                'before_first_page': before_time, 'after_first_page': after_time}
+
 class PDFManager:
     def __init__(self, controller):
         self.controller = controller
+        self.optimizer = PdfOptimizer(controller)
 
     def merge_pdfs(self, input_folder, output_path, sort_by_time=False):
         """PDF 파일들을 합치는 메서드"""
-        merger = PdfMerger()
         pdf_files = []
 
         # 폴더 내의 모든 PDF 파일을 찾기
@@ -535,43 +1311,133 @@ class PDFManager:
             # Day 순서대로 정렬 (파일 이름에 Day 정보가 포함되어 있다고 가정)
             pdf_files.sort(key=lambda x: int(x.split('Day ')[1].split('.')[0]))
 
+        self.merge_pdf_files([os.path.join(input_folder, pdf_file) for pdf_file in pdf_files], output_path)
+
+    def merge_pdf_files(self, pdf_paths, output_path):
+        """주어진 순서 그대로 PDF 파일들을 합치는 메서드"""
+        merger = PdfMerger()
+
         # PDF 파일들을 합치기
-        for pdf_file in pdf_files:
-            pdf_path = os.path.join(input_folder, pdf_file)
+        for pdf_path in pdf_paths:
             merger.append(pdf_path)
 
-        # 합쳐진 PDF 파일 저장
-        merger.write(output_path)
+        # 합쳐진 PDF 파일 저장 (임시 파일에 쓴 뒤 한 번에 공개)
+        with atomic_output(output_path) as f:
+            merger.write(f)
         merger.close()
 
-    def merge_work_pdfs(self):
-        """work 폴더의 PDF 파일들을 Day 순서대로 합치기"""
+    def merge_work_pdfs(self, work_files=None):
+        """work 폴더의 PDF 파일들을 Day 순서대로 합치기
+
+        work_files({Day: 경로})가 주어지면 폴더를 다시 훑지 않고 그 순서대로 합친다.
+        """
         work_folder = self.controller.directories["Work"]
         output_folder = self.controller.directories["Output"]
         output_filename = f"{self.controller.macro.get_filename()} 시험지.pdf"
         output_path = os.path.join(output_folder, output_filename)
 
-        self.merge_pdfs(work_folder, output_path, sort_by_time=False)
+        if work_files:
+            self.merge_pdf_files(list(work_files.values()), output_path)
+        else:
+            self.merge_pdfs(work_folder, output_path, sort_by_time=False)
         self.controller.log(f"시험지 PDF 파일이 합쳐져 저장되었습니다: {output_path}")
 
-    def merge_answer_pdfs(self):
-        """정답 폴더의 PDF 파일들을 시간 순서대로 합치기"""
-        answer_folder = self.controller.directories["Answer"]
+    @staticmethod
+    def missing_answers(work_files, answer_files):
+        """답지가 묶이지 않은 Day 목록 (답지 없이 병합하면 안 됨)"""
+        return [day for day in work_files if day not in (answer_files or {})]
+
+    def build_merge_plan(self, work_files, answer_files):
+        """기본 시험지/답지와 config의 merge_outputs(주간 묶음, 반별 판, 합본, Day별 교차)를 담은 병합 계획 생성
+
+        merge_outputs 예: {"weekly_packet_size": 5, "combined_book": true, "interleaved": true,
+                           "editions": [{"name": "3반", "days": "1-10"}]}
+        """
         output_folder = self.controller.directories["Output"]
-        output_filename = f"{self.controller.macro.get_filename()} 답지.pdf"
-        output_path = os.path.join(output_folder, output_filename)
+        base = self.controller.macro.get_filename()
+        options = Config.get_value('merge_outputs') or {}
+
+        plan = MergePlan()
+        for day, path in work_files.items():
+            plan.add_source(('work', day), path)
+        for day, path in (answer_files or {}).items():
+            plan.add_source(('answer', day), path)
+
+        days = list(work_files)
+
+        def add_pair(label, selected_days):
+            # 시험지와 답지 한 쌍 (label이 비어 있으면 기본 출력)
+            prefix = f"{base} {label}" if label else base
+            plan.add_output(os.path.join(output_folder, f"{prefix} 시험지.pdf"),
+                            [(('work', day), None) for day in selected_days])
+            plan.add_output(os.path.join(output_folder, f"{prefix} 답지.pdf"),
+                            [(('answer', day), None) for day in selected_days])
+
+        add_pair("", days)
+
+        packet_size = options.get('weekly_packet_size')
+        if packet_size:
+            for start in range(0, len(days), packet_size):
+                packet = days[start:start + packet_size]
+                add_pair(f"Day {packet[0]}-{packet[-1]}", packet)
 
-        self.merge_pdfs(answer_folder, output_path, sort_by_time=True)
-        self.controller.log(f"답지 PDF 파일이 합쳐져 저장되었습니다: {output_path}")
+        # editions 형식은 Config.validate에서 확인한다
+        for edition in options.get('editions', []):
+            selected = set(parse_day_ranges(edition['days']))
+            add_pair(edition['name'], [day for day in days if day in selected])
 
-    def cleanup_folders(self):
-        """work 폴더와 정답 폴더를 정리하는 메서드"""
+        if options.get('combined_book'):
+            plan.add_output(os.path.join(output_folder, f"{base} 합본.pdf"),
+                            [(('work', day), None) for day in days] +
+                            [(('answer', day), None) for day in days])
+
+        if options.get('interleaved'):
+            # Day마다 시험지 바로 뒤에 답지, 답지가 없으면 안내 페이지로 대신함
+            items = []
+            for day in days:
+                items.append((('work', day), None))
+                if ('answer', day) not in plan.sources:
+                    self.controller.log(f"Day {day} 답지가 없어 빈 안내 페이지를 넣습니다.")
+                    plan.add_source(('placeholder', day),
+                                    io.BytesIO(build_text_pdf([[f"Day {day}", "Answer key missing"]])))
+                    items.append((('placeholder', day), None))
+                else:
+                    items.append((('answer', day), None))
+            plan.add_output(os.path.join(output_folder, f"{base} 시험지+답지.pdf"), items)
+        
+        for output_path, keys in plan.missing.items():
+            self.controller.log(f"{os.path.basename(output_path)}: 파일이 없어 빠진 Day "
+                                + ", ".join(f"{day}({'답지' if kind == 'answer' else '시험지'})" for kind, day in keys))
+        return plan
+
+    def merge_all(self, work_files, answer_files):
+        """병합 계획을 한 번에 실행 (각 Day PDF는 한 번만 파싱)"""
+        start_time = time.time()
+        with self.controller.profiler.section('merge'):
+            results = self.build_merge_plan(work_files, answer_files).execute()
+        self.controller.metrics.observe('merge_seconds', time.time() - start_time)
+        self.controller.metrics.inc('output_bytes_total', sum(os.path.getsize(path) for path in results))
+        for output_path, page_count in results.items():
+            self.controller.log(f"PDF 파일이 합쳐져 저장되었습니다: {output_path} ({page_count}쪽)")
+        self.controller.debug_log(f"병합 소요 시간: {time.time() - start_time:.2f}초")
+        if Config.get_value('optimize_output'):
+            self.optimizer.submit(list(results))
+        return results
+
+    def cleanup_folders(self, staging_folder=None, work_files=None):
+        """work 폴더와 답지 스테이징 폴더를 정리하는 메서드
+
+        공용 정답 폴더(APPDATA)는 다른 작업과 공유되므로 이번 실행의 스테이징 폴더만 지운다.
+        스테이징 폴더가 없으면 기존처럼 정답 폴더를 비운다.
+        work_files를 주면 (멈춘 작업이 work 폴더를 같이 쓰고 있을 때) 그 파일만 지운다.
+        """
         work_folder = self.controller.directories["Work"]
         answer_folder = self.controller.directories["Answer"]
 
         # work 폴더 정리
-        for filename in os.listdir(work_folder):
-            file_path = os.path.join(work_folder, filename)
+        work_paths = (list(work_files.values()) if work_files is not None
+                      else [os.path.join(work_folder, filename) for filename in os.listdir(work_folder)])
+        for file_path in work_paths:
             try:
                 if os.path.isfile(file_path) or os.path.islink(file_path):
                     os.unlink(file_path)
@@ -580,6 +1446,15 @@ class PDFManager:
             except Exception as e:
                 self.controller.log(f"파일 삭제 중 오류 발생: {file_path} - {str(e)}")
 
+        if staging_folder:
+            # 스테이징 폴더 정리
+            try:
+                shutil.rmtree(staging_folder)
+            except Exception as e:
+                self.controller.log(f"폴더 삭제 중 오류 발생: {staging_folder} - {str(e)}")
+            self.controller.log("work 폴더와 답지 스테이징 폴더가 정리되었습니다.")
+            return
+
         # 정답 폴더 정리
         for filename in os.listdir(answer_folder):
             file_path = os.path.join(answer_folder, filename)
@@ -593,14 +1468,415 @@ class PDFManager:
 
         self.controller.log("work 폴더와 정답 폴더가 정리되었습니다.")
 
+class ScandirBackend:
+    """os.scandir로 폴더의 PDF 목록과 (크기, 수정시각)을 읽는 기본 감시 백엔드"""
+    def snapshot(self, folder):
+        entries = {}
+        with os.scandir(folder) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.lower().endswith(".pdf"):
+                    stat = entry.stat()
+                    entries[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return entries
+
+class AnswerWatcher:
+    """정답 폴더를 감시하여 새 답지를 나타난 순간의 Day와 묶고 스테이징 폴더로 옮기는 클래스
+
+    backend는 snapshot(folder) -> {파일명: 시그니처}를 제공하는 객체면 무엇이든 된다.
+    staging_folder 대신 staging_for(day) -> 폴더를 주면 Day마다 다른 폴더로 옮긴다 (병렬 실행).
+    """
+    def __init__(self, controller, source_folder, staging_folder, day_provider,
+                 backend=None, interval=0.2, staging_for=None):
+        self.controller = controller
+        self.source_folder = source_folder
+        self.staging_folder = staging_folder
+        self.staging_for = staging_for or (lambda day: self.staging_folder)
+        self.day_provider = day_provider
+        self.backend = backend or ScandirBackend()
+        self.interval = interval
+
+        self.answer_files = {}  # Day -> 스테이징된 답지 경로 (Day 순서대로 삽입됨)
+        self._pending = {}      # 파일명 -> (Day, 시그니처), 쓰기가 끝나기를 기다리는 파일
+        self._bind_counts = {}  # Day -> 지금까지 묶인 답지 수
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        if self.staging_folder:
+            os.makedirs(self.staging_folder, exist_ok=True)
+        # 시작 시점에 이미 있던 파일은 이번 실행의 답지가 아니다
+        self._known = set(self.backend.snapshot(self.source_folder))
+
+    def start(self):
+        """감시 스레드 시작"""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10.0):
+        """감시 중지 후 남은 파일을 모두 스테이징 폴더로 이동"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        deadline = time.time() + timeout
+        while True:
+            self.poll()
+            with self._lock:
+                if not self._pending:
+                    break
+            if time.time() > deadline:
+                self.poll(force=True)
+                break
+            time.sleep(self.interval)
+        return self.answer_files
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                self.controller.log(f"답지 감시 중 오류 발생: {str(e)}")
+            self._stop_event.wait(self.interval)
+
+    def poll(self, force=False):
+        """폴더를 한 번 훑어서 새 파일은 Day와 묶고, 쓰기가 끝난 파일은 이동"""
+        with self._lock:
+            snapshot = self.backend.snapshot(self.source_folder)
+            for name, signature in snapshot.items():
+                if name in self._known:
+                    continue
+                self._known.add(name)
+                day = self.day_provider()
+                self._pending[name] = (day, signature)
+                self._bind_counts[day] = self._bind_counts.get(day, 0) + 1
+                self.controller.debug_log(f"새 답지 감지: {name} -> Day {self._pending[name][0]}")
+
+            for name, (day, signature) in list(self._pending.items()):
+                current = snapshot.get(name)
+                if current is None:
+                    del self._pending[name]
+                    continue
+                # 두 번 연속 같은 크기/시각이면 쓰기가 끝난 것으로 본다
+                if current != signature and not force:
+                    self._pending[name] = (day, current)
+                    continue
+                if self._move(name, day):
+                    del self._pending[name]
+
+    def bind_count(self, day):
+        """Day에 지금까지 묶인 답지 수"""
+        with self._lock:
+            return self._bind_counts.get(day, 0)
+
+    def wait_for_binding(self, day, previous_count, timeout=5.0):
+        """Day에 새 답지가 묶일 때까지 폴링하며 대기 (시간 초과 시 False)"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            self.poll()
+            if self.bind_count(day) > previous_count:
+                return True
+            time.sleep(0.05)
+        return False
+
+    def _move(self, name, day):
+        src = os.path.join(self.source_folder, name)
+        staging_folder = self.staging_for(day)
+        os.makedirs(staging_folder, exist_ok=True)
+        dst = os.path.join(staging_folder, f"Day {day}.pdf")
+        try:
+            shutil.move(src, dst)
+        except OSError as e:
+            # 아직 FactoryVoca가 파일을 잡고 있으면 다음 폴링에서 재시도
+            self.controller.debug_log(f"답지 이동 대기: {name} - {str(e)}")
+            return False
+        self.answer_files[day] = dst
+        self.controller.log(f"답지 Day {day} 스테이징: {dst}")
+        return True
+
+class PdfValidator:
+    """출력된 Day PDF를 백그라운드 스레드에서 가볍게 검사하는 클래스
+
+    %%EOF 트레일러, startxref가 가리키는 xref 위치, 페이지 트리의 페이지 수만 확인하고
+    페이지 내용은 읽지 않는다. 실패한 Day는 on_failure(day, 원인)로 알린다.
+    """
+    TAIL_SIZE = 1024
+
+    def __init__(self, controller, on_failure):
+        self.controller = controller
+        self.on_failure = on_failure
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-validator")
+        self._futures = []
+
+    def submit(self, day, pdf_path):
+        """검사 작업을 워커 스레드에 넣기"""
+        future = self.executor.submit(self._run, day, pdf_path)
+        self._futures.append(future)
+        return future
+
+    def wait(self):
+        """지금까지 넣은 검사가 모두 끝날 때까지 대기"""
+        wait_futures(self._futures)
+        self._futures = [f for f in self._futures if not f.done()]
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+    def _run(self, day, pdf_path):
+        try:
+            error = self.validate(day, pdf_path)
+        except Exception as e:
+            error = f"검사 중 오류: {str(e)}"
+        if error:
+            self.controller.log(f"Day {day} PDF 검사 실패: {error}")
+            self.on_failure(day, error)
+            return False
+        self.controller.debug_log(f"Day {day} PDF 검사 통과: {pdf_path}")
+        return True
+
+    def validate(self, day, pdf_path):
+        """문제가 있으면 원인 문자열, 정상이면 None 반환"""
+        if not os.path.exists(pdf_path):
+            return f"파일이 없습니다: {pdf_path}"
+
+        size = os.path.getsize(pdf_path)
+        if size == 0:
+            return "빈 파일입니다"
+
+        with open(pdf_path, 'rb') as f:
+            f.seek(max(0, size - self.TAIL_SIZE))
+            tail = f.read()
+            if b'%%EOF' not in tail:
+                return "%%EOF 트레일러가 없습니다 (잘린 파일)"
+
+            # 증분 저장된 파일은 마지막 startxref가 유효하다
+            offsets = re.findall(rb'startxref\s+(\d+)', tail)
+            if not offsets:
+                return "startxref가 없습니다"
+            xref_offset = int(offsets[-1])
+            if xref_offset >= size:
+                return f"xref 위치가 파일 크기를 벗어났습니다: {xref_offset}"
+
+            # xref 테이블 또는 xref 스트림 객체("N 0 obj")가 있어야 한다
+            f.seek(xref_offset)
+            head = f.read(32).lstrip()
+            if not (head.startswith(b'xref') or re.match(rb'\d+\s+\d+\s+obj', head)):
+                return f"xref 위치가 올바르지 않습니다: {xref_offset}"
+
+        # 페이지 트리만 읽어 페이지 수 확인 (페이지 내용은 파싱하지 않음)
+        page_count = len(PdfReader(pdf_path, strict=False).pages)
+        if page_count == 0:
+            return "페이지가 없습니다"
+
+        expected = Config.get_expected_pages(day)
+        if expected and page_count != expected:
+            return f"페이지 수 불일치: {page_count}쪽 (예상 {expected}쪽)"
+        return None
+
+def extract_header_text(pdf_path, max_lines=5):
+    """첫 페이지 텍스트의 앞부분(머리글)만 추출 (프로세스 풀에서 실행되므로 모듈 함수로 둔다)"""
+    reader = PdfReader(pdf_path, strict=False)
+    text = reader.pages[0].extract_text() or ""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return "\n".join(lines[:max_lines])
+
+class DayVerifier:
+    """출력된 Day PDF의 첫 페이지 머리글이 기대한 Day/유닛 이름과 맞는지 확인하는 클래스
+
+    텍스트 추출은 CPU를 쓰므로 프로세스 풀에서 돌리고, 비교는 wait()를 부른 스레드에서 한다.
+    불일치하면 on_mismatch(day, 원인)로 알린다. day_header_pattern이나 unit_names가 없으면
+    확인하지 않는다 (FactoryVoca 머리글 형식은 설정에 따라 다르므로). 프로세스 풀은 확인할
+    Day가 처음 들어올 때 만든다.
+    """
+    def __init__(self, controller, on_mismatch):
+        self.controller = controller
+        self.on_mismatch = on_mismatch
+        self.executor = None
+        self._pending = []     # (day, pdf_path, future)
+        self._lock = threading.Lock()
+        if not self.configured():
+            self.controller.log("day_header_pattern과 unit_names가 없어 Day 머리글 확인을 하지 않습니다.")
+
+    @staticmethod
+    def configured():
+        """머리글을 확인할 설정(day_header_pattern 또는 unit_names)이 있는지"""
+        return bool(Config.get_value('day_header_pattern') or Config.get_value('unit_names'))
+
+    def submit(self, day, pdf_path):
+        """머리글 추출을 풀에 넣기 (확인할 패턴이 없으면 아무것도 하지 않음)"""
+        if not self.expected_patterns(day):
+            return None
+        with self._lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=Config.get_value('verify_workers', 2))
+            future = self.executor.submit(extract_header_text, pdf_path)
+            self._pending.append((day, pdf_path, future))
+        return future
+
+    def wait(self):
+        """지금까지 넣은 확인 작업을 모두 기다려 비교 (돌아온 뒤에는 불일치가 모두 on_mismatch로 전달됨)"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for day, pdf_path, future in pending:
+            self._check(day, pdf_path, future)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    @staticmethod
+    def header_pattern(day):
+        """day_header_pattern의 {day}를 Day 번호로 바꾼 정규식 (설정이 없으면 None)
+
+        format() 대신 문자열 치환을 써서 \\d{2} 같은 정규식 중괄호를 그대로 둔다.
+        """
+        template = Config.get_value('day_header_pattern')
+        return template.replace('{day}', str(day)) if template else None
+
+    def expected_patterns(self, day):
+        """Day에 대해 머리글에 있어야 하는 정규식 목록"""
+        patterns = []
+        pattern = self.header_pattern(day)
+        if pattern:
+            patterns.append(pattern)
+        unit_names = Config.get_value('unit_names') or {}
+        if str(day) in unit_names:
+            patterns.append(re.escape(unit_names[str(day)]))
+        return patterns
+
+    def _check(self, day, pdf_path, future):
+        try:
+            header = future.result()
+        except Exception as e:
+            # 파일 손상은 PdfValidator가 처리하므로 여기서는 기록만 한다
+            self.controller.log(f"Day {day} 머리글 추출 실패: {str(e)}")
+            return
+
+        if not header:
+            self.controller.log(f"Day {day} 머리글 텍스트가 없어 확인할 수 없습니다: {pdf_path}")
+            return
+
+        missing = [p for p in self.expected_patterns(day) if not re.search(p, header)]
+        if missing:
+            first_line = header.splitlines()[0]
+            self.controller.log(f"Day {day} 머리글 불일치: '{first_line}'")
+            self.on_mismatch(day, f"머리글 불일치 ('{first_line}')")
+            return
+        self.controller.debug_log(f"Day {day} 머리글 확인 완료")
+
 # 매크로 클래스
+class Profiler:
+    """매크로 실행이나 PDF 병합 구간의 파이썬 쪽 시간 사용을 측정하는 프로파일러
+
+    arm()으로 모드(cProfile 결정적 측정 또는 스택 샘플링)와 대상 구간을 정해 두면
+    section()으로 감싼 구간이 실행될 때만 측정한다. 꺼져 있으면 section()은 속성 하나만
+    확인하고 바로 통과한다.
+    """
+    MODES = {"결정적 (cProfile)": "cprofile", "샘플링": "sampling"}
+    TARGETS = {"매크로 실행": "macro", "PDF 병합": "merge"}
+
+    def __init__(self, sample_interval=0.005):
+        self.sample_interval = sample_interval
+        self.mode = None
+        self.target = None
+        self.lock = threading.Lock()
+
+    def arm(self, mode, target):
+        """다음에 target 구간이 실행될 때부터 측정"""
+        with self.lock:
+            self.mode = mode
+            self.target = target
+            self.profile = cProfile.Profile() if mode == "cprofile" else None
+            self.stacks = collections.Counter()
+            self.sample_count = 0
+            self.measured_seconds = 0.0
+
+    @contextmanager
+    def section(self, name):
+        """name 구간을 측정 (대상 구간이 아니거나 꺼져 있으면 그대로 실행)"""
+        if self.mode is None or self.target != name:
+            yield
+            return
+        start_time = time.perf_counter()
+        if self.mode == "cprofile":
+            self.profile.enable()
+            try:
+                yield
+            finally:
+                self.profile.disable()
+                self.measured_seconds += time.perf_counter() - start_time
+        else:
+            stop_event = threading.Event()
+            sampler = threading.Thread(target=self._sample, args=(threading.get_ident(), stop_event), daemon=True)
+            sampler.start()
+            try:
+                yield
+            finally:
+                stop_event.set()
+                sampler.join()
+                self.measured_seconds += time.perf_counter() - start_time
+
+    def _sample(self, thread_id, stop_event):
+        """대상 스레드의 호출 스택을 주기적으로 기록"""
+        while not stop_event.wait(self.sample_interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                with self.lock:
+                    self.stacks[";".join(reversed(stack))] += 1
+                    self.sample_count += 1
+
+    def stop(self):
+        """측정을 끝내고 모드 반환 (켜져 있지 않았으면 None)"""
+        with self.lock:
+            mode, self.mode = self.mode, None
+            return mode
+
+    def top_functions(self, mode, limit=15):
+        """누적 시간 상위 함수 목록 [(함수, 누적 초, 호출/샘플 수)]"""
+        if mode == "cprofile":
+            stats = pstats.Stats(self.profile)
+            rows = []
+            for (filename, line, name), (_, calls, _, cumulative, _) in stats.stats.items():
+                rows.append((f"{name} ({os.path.basename(filename)}:{line})", cumulative, calls))
+        else:
+            cumulative = collections.Counter()
+            for stack, count in self.stacks.items():
+                for function in set(stack.split(";")):
+                    cumulative[function] += count
+            rows = [(function, count * self.sample_interval, count) for function, count in cumulative.items()]
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows[:limit]
+
+    def save(self, mode, folder="profiles"):
+        """결과를 파일로 저장하고 경로 반환
+
+        cProfile은 .prof(pstats/snakeviz), 샘플링은 flamegraph.pl/speedscope가 읽는
+        collapsed stack(.collapsed) 형식.
+        """
+        os.makedirs(folder, exist_ok=True)
+        base = os.path.join(folder, f"{self.target}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        if mode == "cprofile":
+            path = base + ".prof"
+            self.profile.dump_stats(path)
+        else:
+            path = base + ".collapsed"
+            with open(path, 'w', encoding='utf-8') as f:
+                for stack, count in self.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+        return path
+
 class DebugWindow:
     def __init__(self, controller: Controller):
         self.controller = controller
         
         self.window = tk.Toplevel()
         self.window.title("Debug Console")
-        self.window.geometry("600x400")
+        self.window.geometry("600x460")
         
         # 키보드 이벤트 바인딩
         self.window.bind('<F2>', self._get_mouse_position)
@@ -647,8 +1923,44 @@ class DebugWindow:
         ttk.Button(self.button_frame, text="로그 지우기", 
                   command=self.clear_log).pack(side=tk.RIGHT, padx=5, pady=5)
         
+        # 프로파일러 프레임
+        profile_frame = ttk.LabelFrame(self.window, text="프로파일러")
+        profile_frame.pack(padx=10, pady=5, fill=tk.X)
+        
+        self.profile_mode = ttk.Combobox(profile_frame, values=list(Profiler.MODES), state="readonly", width=16)
+        self.profile_mode.set(next(iter(Profiler.MODES)))
+        self.profile_mode.pack(side=tk.LEFT, padx=5, pady=5)
+        self.profile_target = ttk.Combobox(profile_frame, values=list(Profiler.TARGETS), state="readonly", width=12)
+        self.profile_target.set(next(iter(Profiler.TARGETS)))
+        self.profile_target.pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Button(profile_frame, text="측정 시작", 
+                  command=self.start_profiler).pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Button(profile_frame, text="측정 중지 및 저장", 
+                  command=self.stop_profiler).pack(side=tk.LEFT, padx=5, pady=5)
+        
         self.log("디버그 모드가 활성화되었습니다.")
         
+    def start_profiler(self):
+        """선택한 구간이 다음에 실행될 때부터 프로파일링"""
+        self.controller.profiler.arm(Profiler.MODES[self.profile_mode.get()],
+                                     Profiler.TARGETS[self.profile_target.get()])
+        self.log(f"프로파일러 대기: {self.profile_target.get()} 구간을 {self.profile_mode.get()} 방식으로 측정합니다.")
+
+    def stop_profiler(self):
+        """프로파일링을 끝내고 누적 시간 상위 함수를 표시한 뒤 파일로 저장"""
+        profiler = self.controller.profiler
+        mode = profiler.stop()
+        if mode is None:
+            self.log("프로파일러가 켜져 있지 않습니다.")
+            return
+        if profiler.measured_seconds == 0:
+            self.log("측정된 구간이 없습니다.")
+            return
+        self.log(f"--- 누적 시간 상위 함수 (측정 {profiler.measured_seconds:.2f}초) ---")
+        for function, cumulative, count in profiler.top_functions(mode):
+            self.log(f"{cumulative:8.3f}초 {count:>7}회  {function}")
+        self.log(f"저장: {profiler.save(mode)}")
+
     def detect_all_windows(self):
         """모든 창의 개수를 감지하여 로그에 출력"""
         try:
@@ -819,14 +2131,1861 @@ class DebugWindow:
         except Exception as e:
             self.log(f"오류 발생: {str(e)}")
 
-class MacroController:
-    def __init__(self, controller: Controller):
+def get_default_printer():
+    """기본 프린터 이름 (조회할 수 없으면 None)"""
+    if win32print is not None:
+        try:
+            return win32print.GetDefaultPrinter()
+        except Exception:
+            return None
+    if platform.system() == "Windows":
+        command = ["powershell", "-NoProfile", "-Command",
+                   "(Get-CimInstance Win32_Printer -Filter 'Default=True').Name"]
+    else:
+        command = ["lpstat", "-d"]
+    try:
+        output = subprocess.run(command, capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if ":" in output and command[0] == "lpstat":
+        output = output.split(":", 1)[1].strip()  # "system default destination: <이름>"
+    return output or None
+
+class Preflight:
+    """작업 전 확인사항 중 자동으로 확인할 수 있는 항목을 검사하는 클래스
+
+    기본 프린터는 OS에 조회하고, FactoryVoca 화면 상태는 config의 preflight_probes에 적은
+    위치의 픽셀 색으로 확인한다. 프린터 조회 결과는 설정이 바뀌지 않는 한 세션 동안 재사용하지만,
+    화면 상태는 작업 사이에 사용자가 바꿀 수 있고 픽셀 몇 개만 읽으면 되므로 매번 다시 확인한다.
+    확인 방법이 없는 항목은 사람이 체크하도록 None으로 남긴다.
+    """
+    ITEMS = {
+        'title': "첫페이지 제목(ex. 랜덤ver1) 설정하기",
+        'printer': "기본 프린터 PDF로 설정하기",
+        'date_blank': "추가기능 -> 날짜 설정에서 빈칸으로 설정하기",
+        'excel_fit': "엑셀 인쇄 페이지 크기 맞추기",
+        'wordbook': "단어장 검색해서 설정하기",
+        'unit_name_off': "'첫단어에 유닛이름 표시' 해제하기",
+    }
+
+    def __init__(self, controller):
         self.controller = controller
-        
-        self.auto_answer_save = False
-        self.print_output_path_set = False
+        self.cache = {}
 
-    def log(self, message):
+    @staticmethod
+    def get_probes(item_id):
+        """항목의 픽셀 검사 목록 (하나만 적었으면 목록으로 감쌈)"""
+        probes = (Config.get_value('preflight_probes') or {}).get(item_id) or []
+        return [probes] if isinstance(probes, dict) else probes
+
+    @classmethod
+    def iter_probes(cls):
+        for item_id in cls.ITEMS:
+            yield from cls.get_probes(item_id)
+
+    def run(self, force=False):
+        """{항목: (결과, 설명)} 반환. 결과는 True(통과), False(실패), None(자동 확인 불가)"""
+        results = {}
+        window = None
+        for item_id in self.ITEMS:
+            fingerprint = None
+            if item_id == 'printer':
+                fingerprint = ('printer', Config.get_value('preflight_printer_pattern'))
+            else:
+                probes = self.get_probes(item_id)
+                if not probes:
+                    results[item_id] = (None, "자동 확인 방법 없음")
+                    continue
+                if window is None:
+                    with self.controller.macro.focus_lock:
+                        window = self.controller.macro.find_and_activate_window("Factoryvoca")
+                    if not window:
+                        results[item_id] = (False, "FactoryVoca 창을 찾을 수 없습니다")
+                        continue
+
+            cached = self.cache.get(item_id)
+            if not force and fingerprint is not None and cached and cached[0] == fingerprint:
+                results[item_id] = cached[1]
+                continue
+
+            result = self.check_printer() if item_id == 'printer' else self.check_probes(window, probes)
+            if result[0] is not False and fingerprint is not None:
+                self.cache[item_id] = (fingerprint, result)  # 실패한 항목은 다음에 다시 검사
+            else:
+                self.cache.pop(item_id, None)
+            results[item_id] = result
+            if result[0] is not None:
+                self.controller.log(f"사전 점검 {'통과' if result[0] else '실패'}: {self.ITEMS[item_id]} ({result[1]})")
+        return results
+
+    def check_printer(self):
+        name = get_default_printer()
+        if name is None:
+            return (None, "기본 프린터를 조회할 수 없습니다")
+        pattern = Config.get_value('preflight_printer_pattern') or "PDF"
+        if re.search(pattern, name, re.IGNORECASE):
+            return (True, name)
+        return (False, f"기본 프린터가 {name}입니다")
+
+    def check_probes(self, window, probes):
+        backend = self.controller.macro.backend
+        with self.controller.macro.focus_lock:
+            backend.activate(window)
+            for probe in probes:
+                x, y = probe['position']
+                color = backend.pixel(window.left + x, window.top + y)
+                tolerance = probe.get('tolerance', 16)
+                if any(abs(actual - expected) > tolerance for actual, expected in zip(color, probe['color'])):
+                    return (False, f"({x}, {y}) 색이 {tuple(color)}로 {tuple(probe['color'])}와 다릅니다")
+        return (True, "화면 확인")
+
+class PyAutoGuiBackend:
+    """pyautogui로 실제 화면을 조작하는 기본 GUI 백엔드
+
+    Tk 루트가 있으면 클립보드는 프로세스 안의 Tk 클립보드를 계속 사용하고
+    (호출마다 도우미 프로세스를 띄우지 않음), 없으면 pyperclip을 사용한다.
+    Tk 클립보드는 ui(UiDispatcher)를 거쳐 메인 스레드에서만 건드린다.
+    """
+    def __init__(self, root=None, ui=None):
+        self.root = root
+        self.ui = ui or UiDispatcher(None)
+
+    def get_windows_with_title(self, title):
+        return pyautogui.getWindowsWithTitle(title)
+
+    def get_all_windows(self):
+        return pyautogui.getAllWindows()
+
+    def activate(self, window):
+        window.activate()
+
+    def click(self, x, y):
+        pyautogui.click(x, y)
+
+    def press(self, key):
+        pyautogui.press(key)
+
+    def hotkey(self, *keys):
+        pyautogui.hotkey(*keys)
+
+    def write(self, text):
+        pyautogui.write(text)
+
+    def copy(self, text):
+        if self.root:
+            self.ui.call(self._copy_tk, text)
+        else:
+            pyperclip.copy(text)
+
+    def _copy_tk(self, text):
+        self.root.clipboard_clear()
+        self.root.clipboard_append(text)
+        self.root.update()  # 다른 프로그램이 붙여넣을 수 있도록 클립보드 소유권 반영
+
+    def get_clipboard(self):
+        if self.root:
+            return self.ui.call(self._get_clipboard_tk)
+        return pyperclip.paste()
+
+    def _get_clipboard_tk(self):
+        try:
+            return self.root.clipboard_get()
+        except tk.TclError:  # 클립보드가 비어 있거나 텍스트가 아님
+            return None
+
+    def sleep(self, seconds):
+        pyautogui.sleep(seconds)
+
+    def pixel(self, x, y):
+        return tuple(pyautogui.pixel(x, y))[:3]
+
+def build_text_pdf(pages):
+    """페이지별 텍스트 줄 목록으로 간단한 PDF 바이트를 만든다 (Helvetica, 한글은 '?'로 대체)"""
+    def escape(text):
+        return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+    page_count = len(pages)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            " ".join(f"{4 + 2 * i} 0 R" for i in range(page_count)), page_count)).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, lines in enumerate(pages):
+        content = "BT /F1 12 Tf 14 TL 50 800 Td " + " ".join(f"({escape(line)}) '" for line in lines) + " ET"
+        data = content.encode('latin-1', 'replace')
+        objects.append((
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            "/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (5 + 2 * i)).encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+    return serialize_pdf(objects)
+
+def serialize_pdf(objects):
+    """객체 목록(1번이 Catalog)을 xref가 있는 PDF 바이트로 만든다"""
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return bytes(out)
+
+def build_wordbook_pdf(pages):
+    """페이지별 줄 목록으로 단어장 PDF 바이트를 만든다
+
+    줄은 [(x, 텍스트), ...] 칸 목록이다. 영문 칸은 Helvetica, 한글이 있는 칸은 표준 한글
+    글꼴(HYSMyeongJo-Medium)을 이름으로만 지정하므로 글꼴 파일을 넣지 않아도 되지만,
+    여는 뷰어/프린터 쪽에 한글 글꼴 팩이 있어야 한다. UCS-2 인코딩이라 기본 다국어 평면
+    밖의 문자는 '?'로 바꾼다.
+    """
+    # UCS-2 코드를 그대로 유니코드로 읽도록 하는 ToUnicode (텍스트 검색/추출용)
+    to_unicode = ("/CIDInit /ProcSet findresource begin 12 dict begin begincmap "
+                  "/CMapName /UCS2-Identity def /CMapType 2 def 1 begincodespacerange <0000> <FFFF> endcodespacerange "
+                  + "".join(f"100 beginbfrange {''.join(f'<{h:02X}00> <{h:02X}FF> <{h:02X}00> ' for h in range(start, min(start + 100, 256)))}endbfrange "
+                            for start in range(0, 256, 100))
+                  + "endcmap CMapName currentdict /CMap defineresource pop end end").encode()
+    page_count = len(pages)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            " ".join(f"{7 + 2 * i} 0 R" for i in range(page_count)), page_count)).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Type /Font /Subtype /Type0 /BaseFont /HYSMyeongJo-Medium /Encoding /UniKS-UCS2-H "
+        b"/DescendantFonts [<< /Type /Font /Subtype /CIDFontType0 /BaseFont /HYSMyeongJo-Medium "
+        b"/CIDSystemInfo << /Registry (Adobe) /Ordering (Korea1) /Supplement 1 >> "
+        b"/FontDescriptor 5 0 R /DW 1000 >>] /ToUnicode 6 0 R >>",
+        b"<< /Type /FontDescriptor /FontName /HYSMyeongJo-Medium /Flags 6 /FontBBox [0 -148 1001 880] "
+        b"/ItalicAngle 0 /Ascent 880 /Descent -120 /CapHeight 880 /StemV 93 >>",
+        b"<< /Length %d >>\nstream\n" % len(to_unicode) + to_unicode + b"\nendstream",
+    ]
+    for i, lines in enumerate(pages):
+        content = []
+        for line_number, cells in enumerate(lines):
+            y = 800 - line_number * 20
+            for x, text in cells:
+                if text.isascii():
+                    escaped = text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+                    content.append(f"BT /F1 11 Tf {x} {y} Td ({escaped}) Tj ET")
+                else:
+                    text = "".join(ch if ord(ch) <= 0xFFFF else "?" for ch in text)
+                    content.append(f"BT /F2 11 Tf {x} {y} Td <{text.encode('utf-16-be').hex()}> Tj ET")
+        data = "\n".join(content).encode('ascii')
+        objects.append((
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            "/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>" % (8 + 2 * i)).encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+    return serialize_pdf(objects)
+
+def load_wordbook_source(path):
+    """단어장 자료 읽기 -> {Day: [(영어, 뜻), ...]}
+
+    CSV는 day,word,meaning 머리행이 있는 UTF-8 파일, JSON은 {"Day": [[영어, 뜻], ...]} 형식.
+    """
+    words = collections.defaultdict(list)
+    if path.lower().endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            for day, entries in json.load(f).items():
+                words[int(day)].extend((english, meaning) for english, meaning in entries)
+    else:
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            for row in csv.DictReader(f):
+                words[int(row['day'])].append((row['word'].strip(), row['meaning'].strip()))
+    return dict(words)
+
+def order_words(words, wordbook_type, version, day, word_count=None, eng_kor_ratio=0.5):
+    """단어장 종류에 맞게 문제 순서와 방향을 정한다 -> [(문제, 정답), ...]
+
+    랜덤 순서는 (종류, 버전, Day)로 시드를 정하므로 같은 버전은 어느 PC/프로세스에서도 같다.
+    영한랜덤은 eng_kor_ratio만큼 영어->뜻, 나머지는 뜻->영어로 묻는다.
+    """
+    rng = random.Random(f"{wordbook_type.value}:{version or ''}:{day}")
+    words = list(words)
+    if wordbook_type != WordbookType.ORIGINAL:
+        rng.shuffle(words)
+    if word_count:
+        words = words[:word_count]
+    if wordbook_type != WordbookType.ENG_KOR_RANDOM:
+        return words
+    eng_to_kor = set(rng.sample(range(len(words)), round(len(words) * eng_kor_ratio)))
+    return [(english, meaning) if i in eng_to_kor else (meaning, english)
+            for i, (english, meaning) in enumerate(words)]
+
+def render_day_pdfs(day, title, unit_name, questions, show_first_letter, test_path, answer_path):
+    """Day 하나의 시험지와 답지 PDF 쓰기 (NativeRenderer의 프로세스 풀에서 실행)"""
+    rows_per_page = 34
+    for path, with_answers in ((test_path, False), (answer_path, True)):
+        pages = []
+        for start in range(0, max(len(questions), 1), rows_per_page):
+            lines = [[(50, f"Day {day:02d}"), (120, unit_name or "")], [(50, title)], []]
+            for number, (prompt, answer) in enumerate(questions[start:start + rows_per_page], start + 1):
+                if with_answers:
+                    blank = answer
+                elif show_first_letter:
+                    blank = answer[:1] + " ____________"
+                else:
+                    blank = "______________"
+                lines.append([(50, f"{number}."), (80, prompt), (320, blank)])
+            pages.append(lines)
+        with atomic_output(path) as f:
+            f.write(build_wordbook_pdf(pages))
+    return day
+
+class NativeRenderer:
+    """FactoryVoca 창 없이 단어장 자료로 Day별 시험지/답지 PDF를 바로 만드는 출력 엔진
+
+    config의 engine이 "native"이면 매크로 대신 사용한다. Day별 PDF는 프로세스 풀에서 만들고
+    기존과 같은 work 폴더/스테이징 폴더에 써서 PDFManager.merge_all로 병합한다.
+    원래순서는 FactoryVoca와 같은 순서지만 랜덤/영한랜덤은 FactoryVoca의 순서를 재현하지 못하므로
+    파일 이름과 제목에 TAG를 붙여 같은 버전의 GUI 출력과 구별한다.
+    """
+    TAG = "직접출력"
+
+    def __init__(self, controller):
+        self.controller = controller
+
+    @staticmethod
+    def tags_output(input_values):
+        """이 작업의 출력 이름에 TAG를 붙여야 하는지 (직접 출력하는 랜덤/영한랜덤)"""
+        return Config.get_value('engine') == 'native' and input_values['type'] != WordbookType.ORIGINAL
+
+    def log(self, message):
+        self.controller.log(message)
+
+    @staticmethod
+    def get_settings():
+        return Config.get_value('native_renderer') or {}
+
+    def run(self, macro, day_start, day_end):
+        """macro.input_values의 Day 범위를 출력하고 병합. 병합 결과 반환 (실패하면 None)"""
+        settings = self.get_settings()
+        input_values = macro.input_values
+        days = list(range(day_start, day_end + 1))
+        try:
+            words = load_wordbook_source(settings['source'])
+        except (KeyError, OSError, ValueError) as e:
+            macro.stop_macro(f"단어장 자료를 읽을 수 없습니다 (native_renderer.source): {e}")
+            return None
+        missing = [day for day in days if not words.get(day)]
+        if missing:
+            macro.stop_macro("단어장 자료에 없는 Day: " + ", ".join(map(str, missing)))
+            return None
+
+        self.controller.select_staging_root(len(days))
+        staging_folder = os.path.join(self.controller.directories["Staging"],
+                                      datetime.now().strftime('%Y%m%d_%H%M%S_%f'))
+        os.makedirs(staging_folder, exist_ok=True)
+        unit_names = Config.get_value('unit_names') or {}
+        title = macro.get_filename()
+        work_files = {day: os.path.join(macro.get_work_folder(), f"{macro.get_filename(day)}.pdf") for day in days}
+        answer_files = {day: os.path.join(staging_folder, f"Day {day}.pdf") for day in days}
+
+        job_id = self.controller.history.start_job(input_values) if macro.record_history else None
+        started_at = time.time()
+        completed = False
+        try:
+            with ProcessPoolExecutor(max_workers=settings.get('workers', os.cpu_count())) as executor:
+                futures = [executor.submit(
+                    render_day_pdfs, day, title, unit_names.get(str(day)),
+                    order_words(words[day], input_values['type'], input_values['version'], day,
+                                settings.get('word_count'), settings.get('eng_kor_ratio', 0.5)),
+                    settings.get('show_first_letter', False), work_files[day], answer_files[day])
+                    for day in days]
+                try:
+                    for done, future in enumerate(futures, 1):
+                        day = future.result()
+                        self.controller.metrics.inc('days_completed_total')
+                        if macro.window is None:
+                            self.controller.report_progress(day, done, len(days), started_at, input_values['type'])
+                except BaseException:
+                    # 아직 시작하지 않은 Day는 만들지 않는다
+                    for pending in futures:
+                        pending.cancel()
+                    raise
+            completed = True
+        except Exception as e:
+            # 워커 오류(잘못된 자료, 파일 쓰기 실패 등)는 이번 실행의 파일을 정리하고 중단
+            macro.stop_macro(f"Day PDF를 만들지 못했습니다: {e}")
+            self.controller.pdf_manager.cleanup_folders(staging_folder, work_files)
+            return None
+        finally:
+            if job_id is not None:
+                self.controller.history.finish_job(job_id, "completed" if completed else "stopped")
+        self.log(f"Day {len(days)}개 직접 출력 완료 ({time.time() - started_at:.2f}초)")
+
+        results = self.controller.pdf_manager.merge_all(work_files, answer_files)
+        self.controller.pdf_manager.cleanup_folders(staging_folder, work_files)
+        return results
+
+class SimulatedWindow:
+    """SimulatedBackend의 가짜 창 (pygetwindow 창과 같은 속성 제공)"""
+    def __init__(self, backend, title, left, top, width=1000, height=700, app=None):
+        self.backend = backend
+        self.title = title
+        self.left = left
+        self.top = top
+        self.width = width
+        self.height = height
+        self.app = app
+        self._hWnd = id(self)
+
+    def activate(self):
+        self.backend.activate(self)
+
+class SimulatedFactoryVoca:
+    """SimulatedBackend 안에서 FactoryVoca 한 개의 화면 상태를 흉내낸다"""
+    def __init__(self, index, window):
+        self.index = index
+        self.window = window
+        self.focus = None          # 'list', 'path', 'filename'
+        self.cursor = 0            # Day 리스트에서 커서가 있는 행 (0부터)
+        self.selected_day = None   # 오른쪽 목록에 추가된 Day
+        self.loaded_day = None     # 불러오기 된 Day
+        self.auto_answer_save = False
+        self.show_first_letter = False
+        self.inputs = {}           # 'word_count', 'eng_to_kor' 입력 칸 내용
+        self.output_folder = None
+        self.dialog = None
+        self.typed = ""
+        self.select_all = False
+        self.busy_until = 0.0      # 이 시각 전까지 들어온 입력은 무시 (SimulatedBackend.latency)
+
+class SimulatedBackend:
+    """FactoryVoca 창과 PDF 출력을 흉내내는 로컬 백엔드 (화면 없이 병렬 실행/재현 테스트용)
+
+    instances개의 FactoryVoca 창을 만들고, 클릭 좌표는 config의 ui_positions로 해석한다.
+    출력 대화상자에서 엔터를 누르면 (자동 저장이 켜져 있으면) 답지를 answer_folder에 바로 쓰고,
+    export_seconds 뒤에 'Day N' 머리글이 있는 PDF를 출력 폴더에 쓴다. speed배로 시간을 압축한다.
+    """
+    def __init__(self, instances=1, answer_folder=None, speed=1.0, export_seconds=1.0, day_count=200, latency=0.0):
+        self.answer_folder = answer_folder
+        self.speed = speed
+        # 불러오기/출력 버튼 뒤 창이 입력을 받지 않는 시간 (딜레이가 이보다 짧으면 입력이 사라짐)
+        self.latency = latency
+        self.export_seconds = export_seconds
+        self.day_count = day_count
+        self.clipboard = ""
+        self.active = None
+        self._lock = threading.RLock()
+        self._answer_serial = 0
+        self._exports = []
+
+        title = Config.get_value('window_title')
+        self.windows = []
+        self.apps = []
+        for i in range(instances):
+            # 첫 창은 config의 제목 그대로, 나머지는 제목 뒤에 번호를 붙여 구분
+            window = SimulatedWindow(self, title if i == 0 else f"{title} #{i + 1}", left=40 * i, top=40 * i)
+            window.app = SimulatedFactoryVoca(i + 1, window)
+            self.windows.append(window)
+            self.apps.append(window.app)
+
+        positions = Config.get_all_positions()
+        self._position_keys = {}
+        for key in positions:
+            coords = Config.get_position(key)
+            self._position_keys.setdefault(tuple(coords), key)
+
+        # 단축키 하나로 된 keyboard_actions는 해당 위치를 클릭한 것처럼 처리
+        self._accelerators = {}
+        for key in (Config.get_value('keyboard_actions') or {}):
+            steps = Config.get_key_sequence(key)
+            if len(steps) == 1:
+                self._accelerators[steps[0]] = key
+
+    def get_windows_with_title(self, title):
+        with self._lock:
+            return [w for w in self.windows if title.upper() in w.title.upper()]
+
+    def get_all_windows(self):
+        with self._lock:
+            return list(self.windows)
+
+    def activate(self, window):
+        with self._lock:
+            self.active = window
+
+    def click(self, x, y):
+        with self._lock:
+            window = self.active
+            if window is None:
+                return
+            self._operate(window, self._position_keys.get((x - window.left, y - window.top)))
+
+    def _is_busy(self, app):
+        return app is not None and time.time() < app.busy_until
+
+    def _set_busy(self, app):
+        if self.latency:
+            app.busy_until = time.time() + self.latency / self.speed
+
+    def _operate(self, window, key):
+        """창의 key 위치 컨트롤 조작 (클릭 또는 단축키)"""
+        with self._lock:
+            app = window.app
+            if self._is_busy(app):
+                return
+            if window is app.dialog:
+                if key == 'buttons.set_output_path':
+                    app.focus, app.typed = 'path', ""
+                elif key == 'inputs.input_filename':
+                    app.focus, app.typed = 'filename', ""
+                return
+
+            if key == 'day_list.first_day':
+                app.focus, app.cursor = 'list', 0
+            elif key == 'buttons.remove_day':
+                app.selected_day = None
+            elif key == 'buttons.add_day':
+                app.selected_day = app.cursor + 1
+            elif key == 'buttons.load_day':
+                app.loaded_day = app.selected_day
+                self._set_busy(app)
+            elif key == 'checkboxes.auto_answer_save':
+                app.auto_answer_save = not app.auto_answer_save
+            elif key == 'checkboxes.show_first_letter':
+                app.show_first_letter = not app.show_first_letter
+            elif key in ('inputs.word_count', 'inputs.eng_to_kor'):
+                app.focus, app.typed = key.split('.', 1)[1], ""
+            elif key == 'buttons.print':
+                app.dialog = SimulatedWindow(self, Config.get_value('print_title'),
+                                             window.left + 100, window.top + 100, 500, 300, app)
+                self.windows.append(app.dialog)
+                self.active = app.dialog
+                app.focus, app.typed = 'filename', ""
+                self._set_busy(app)
+            else:
+                app.focus = None
+
+    def press(self, key):
+        with self._lock:
+            window = self.active
+            if window is None:
+                return
+            if (key,) in self._accelerators:
+                self._operate(window, self._accelerators[(key,)])
+                return
+            app = window.app
+            if self._is_busy(app):
+                return
+            if window is app.dialog and key in ('esc', 'escape'):
+                # 출력하지 않고 대화상자 닫기
+                self.windows.remove(app.dialog)
+                self.active = app.window
+                app.dialog = None
+                return
+            page_size = Config.get_value('page_down_size', 16)
+            if app.focus == 'list':
+                if key == 'home':
+                    app.cursor = 0
+                elif key == 'pagedown':
+                    app.cursor = min(app.cursor + page_size, self.day_count - 1)
+                elif key == 'down':
+                    app.cursor = min(app.cursor + 1, self.day_count - 1)
+                elif key == 'up':
+                    app.cursor = max(app.cursor - 1, 0)
+            elif window is app.dialog and key == 'enter':
+                if app.focus == 'path':
+                    app.output_folder, app.typed = app.typed, ""
+                else:
+                    self._start_export(app, app.typed)
+
+    def hotkey(self, *keys):
+        with self._lock:
+            app = self.active.app if self.active is not None else None
+            if self._is_busy(app):
+                return
+            if keys in self._accelerators and app:
+                self._operate(self.active, self._accelerators[keys])
+            elif keys == ('ctrl', 'v'):
+                self.write(self.clipboard)
+            elif keys == ('ctrl', 'a') and app:
+                app.select_all = True
+            elif keys == ('ctrl', 'c') and app:
+                self.clipboard = app.typed
+
+    def write(self, text):
+        with self._lock:
+            if self.active is not None and not self._is_busy(self.active.app):
+                app = self.active.app
+                # 전체 선택 상태에서 입력하면 기존 내용을 덮어쓴다
+                app.typed = text if app.select_all else app.typed + text
+                app.select_all = False
+                if app.focus in ('word_count', 'eng_to_kor'):
+                    app.inputs[app.focus] = app.typed
+
+    def copy(self, text):
+        self.clipboard = text
+
+    def get_clipboard(self):
+        return self.clipboard
+
+    def pixel(self, x, y):
+        """설정이 모두 끝난 FactoryVoca처럼 preflight_probes 위치에서는 기대한 색을 돌려준다"""
+        with self._lock:
+            window = self.active
+        if window is not None:
+            for probe in Preflight.iter_probes():
+                if tuple(probe['position']) == (x - window.left, y - window.top):
+                    return tuple(probe['color'])
+            # state_probes 위치에서는 체크박스가 켜져 있을 때만 그 색
+            for field, probe in (Config.get_value('state_probes') or {}).items():
+                if tuple(probe['position']) == (x - window.left, y - window.top):
+                    return tuple(probe['color']) if getattr(window.app, field, False) else (255, 255, 255)
+        return (255, 255, 255)
+
+    def sleep(self, seconds):
+        time.sleep(seconds / self.speed)
+
+    def wait_exports(self):
+        """진행 중인 가상 출력이 모두 끝날 때까지 대기"""
+        for thread in list(self._exports):
+            thread.join()
+
+    def _start_export(self, app, filename):
+        # 대화상자를 닫고, 파일 쓰기는 백그라운드에서 진행
+        self.windows.remove(app.dialog)
+        self.active = app.window
+        app.dialog = None
+        header = f"Day {app.loaded_day:02d}" if app.loaded_day else "Day ??"
+
+        # 답지는 FactoryVoca가 출력을 시작할 때 바로 저장한다
+        if app.auto_answer_save and self.answer_folder:
+            self._answer_serial += 1
+            answer_name = f"정답_{self._answer_serial}_{datetime.now().strftime('%H%M%S')}.pdf"
+            with open(os.path.join(self.answer_folder, answer_name), 'wb') as f:
+                f.write(build_text_pdf([[header, "answer"]]))
+
+        thread = threading.Thread(target=self._export, args=(app.output_folder, filename, header), daemon=True)
+        self._exports.append(thread)
+        thread.start()
+
+    def _export(self, output_folder, filename, header):
+        time.sleep(self.export_seconds / self.speed)
+        if output_folder and os.path.isdir(output_folder):
+            with open(os.path.join(output_folder, f"{filename}.pdf"), 'wb') as f:
+                f.write(build_text_pdf([[header, filename]]))
+
+def open_trace(path, mode):
+    """트레이스 파일 열기 (.gz로 끝나면 gzip 압축)"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def describe_window(window):
+    """트레이스에 기록할 창 정보"""
+    return {
+        'title': window.title,
+        'handle': getattr(window, '_hWnd', id(window)),
+        'rect': [window.left, window.top, window.width, window.height]
+    }
+
+class MeteredBackend:
+    """창 목록 조회 횟수를 Metrics에 세는 백엔드 래퍼 (나머지 호출은 그대로 전달)"""
+    def __init__(self, backend, metrics):
+        self.backend = backend
+        self.metrics = metrics
+
+    def get_windows_with_title(self, title):
+        self.metrics.inc('window_enumerations_total', call="get_windows_with_title")
+        return self.backend.get_windows_with_title(title)
+
+    def get_all_windows(self):
+        self.metrics.inc('window_enumerations_total', call="get_all_windows")
+        return self.backend.get_all_windows()
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+class RecordingBackend:
+    """다른 백엔드를 감싸서 모든 호출과 결과를 JSONL 트레이스로 기록하는 백엔드
+
+    한 줄에 이벤트 하나: {"t": 시작 후 경과 초, "th": 스레드 이름, "op": 호출, "args": 인자, "result": 결과}
+    """
+    def __init__(self, backend, trace_path):
+        self.backend = backend
+        self.trace_path = trace_path
+        self._file = open_trace(trace_path, 'w')
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._record('start', [datetime.now().isoformat(), Config.get_value('window_title')])
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def _record(self, op, args, result=None):
+        event = {
+            't': round(time.perf_counter() - self._start, 4),
+            'th': threading.current_thread().name,
+            'op': op,
+            'args': args
+        }
+        if result is not None:
+            event['result'] = result
+        line = json.dumps(event, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line + "\n")
+                self._file.flush()
+
+    def get_windows_with_title(self, title):
+        windows = self.backend.get_windows_with_title(title)
+        self._record('get_windows_with_title', [title], [describe_window(w) for w in windows])
+        return windows
+
+    def get_all_windows(self):
+        windows = self.backend.get_all_windows()
+        self._record('get_all_windows', [], len(windows))
+        return windows
+
+    def activate(self, window):
+        self._record('activate', [describe_window(window)])
+        self.backend.activate(window)
+
+    def click(self, x, y):
+        self._record('click', [x, y])
+        self.backend.click(x, y)
+
+    def press(self, key):
+        self._record('press', [key])
+        self.backend.press(key)
+
+    def hotkey(self, *keys):
+        self._record('hotkey', list(keys))
+        self.backend.hotkey(*keys)
+
+    def write(self, text):
+        self._record('write', [text])
+        self.backend.write(text)
+
+    def copy(self, text):
+        self._record('copy', [text])
+        self.backend.copy(text)
+
+    def get_clipboard(self):
+        text = self.backend.get_clipboard()
+        self._record('get_clipboard', [], text)
+        return text
+
+    def pixel(self, x, y):
+        color = self.backend.pixel(x, y)
+        self._record('pixel', [x, y], list(color))
+        return color
+
+    def sleep(self, seconds):
+        self._record('sleep', [seconds])
+        self.backend.sleep(seconds)
+
+    def __getattr__(self, name):
+        # 기록 대상이 아닌 백엔드 고유 기능(wait_exports 등)은 그대로 전달
+        return getattr(self.backend, name)
+
+class TraceReplayer:
+    """RecordingBackend가 남긴 트레이스를 다른 백엔드에서 다시 실행하는 클래스
+
+    이벤트 사이의 간격을 speed배로 줄여서(0이면 간격 없이) 재현하고, sleep 이벤트는
+    기록된 시각으로 대신한다. 창 조회 결과가 기록과 다르면 불일치로 센다.
+    """
+    ACTIONS = ('click', 'press', 'hotkey', 'write', 'copy')
+
+    def __init__(self, backend, trace_path, speed=1.0, log=print):
+        self.backend = backend
+        self.trace_path = trace_path
+        self.speed = speed
+        self.log = log
+
+    def load_events(self):
+        events = []
+        with open_trace(self.trace_path, 'r') as f:
+            try:
+                for line in f:
+                    if line.strip():
+                        events.append(json.loads(line))
+            except (EOFError, ValueError):
+                # 비정상 종료로 gzip 끝 표시가 없거나 마지막 줄이 잘려도 이벤트마다 flush했으므로 거기까지 재현
+                self.log(f"트레이스가 중간에 끝났습니다 (이벤트 {len(events)}개까지 재현)")
+        return events
+
+    def find_window(self, recorded):
+        """기록된 창과 제목이 같은 창 찾기 (같은 제목이 여럿이면 기록된 순서대로 대응)"""
+        candidates = [w for w in self.backend.get_windows_with_title(recorded['title'])
+                      if w.title == recorded['title']]
+        if not candidates:
+            return None
+        index = self._handles.setdefault(recorded['handle'], len(self._handles)) % len(candidates)
+        return candidates[index]
+
+    def replay(self):
+        """트레이스 재현 후 요약(이벤트 수, 불일치 수, 기록/재현 소요 시간)을 반환"""
+        events = self.load_events()
+        self._handles = {}
+        mismatches = 0
+        executed = 0
+        start = time.perf_counter()
+
+        for event in events:
+            if self.speed:
+                delay = event['t'] / self.speed - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+
+            op, args = event['op'], event['args']
+            if op in self.ACTIONS:
+                getattr(self.backend, op)(*args)
+                executed += 1
+            elif op == 'activate':
+                window = self.find_window(args[0])
+                if window is None:
+                    mismatches += 1
+                    self.log(f"[{event['t']}] 창을 찾을 수 없습니다: {args[0]['title']}")
+                else:
+                    self.backend.activate(window)
+                    executed += 1
+            elif op == 'get_windows_with_title':
+                found = self.backend.get_windows_with_title(*args)
+                if len(found) != len(event.get('result', [])):
+                    mismatches += 1
+                    self.log(f"[{event['t']}] '{args[0]}' 창 개수 불일치: 기록 {len(event['result'])}, 재현 {len(found)}")
+            elif op == 'get_all_windows':
+                found = self.backend.get_all_windows()
+                if len(found) != event.get('result'):
+                    mismatches += 1
+                    self.log(f"[{event['t']}] 전체 창 개수 불일치: 기록 {event['result']}, 재현 {len(found)}")
+
+        return {
+            'events': len(events),
+            'executed': executed,
+            'mismatches': mismatches,
+            'recorded_seconds': events[-1]['t'] if events else 0,
+            'replay_seconds': round(time.perf_counter() - start, 3)
+        }
+
+class ShardedRunner:
+    """여러 FactoryVoca 창에 Day 범위를 나눠 동시에 출력하는 클래스
+
+    창마다 MacroController 워커를 하나씩 두고, 마우스/키보드 포커스만 하나의 잠금으로
+    직렬화한다. 출력 대화상자가 닫히면 포커스를 넘기므로 PDF 출력은 동시에 진행되고,
+    마지막에 모든 워커의 결과를 Day 순서대로 합친다.
+    """
+    def __init__(self, controller, input_values, worker_count=None):
+        self.controller = controller
+        self.input_values = input_values
+        self.worker_count = worker_count
+
+    def log(self, message):
+        self.controller.log(message)
+
+    def discover_windows(self):
+        """제목이 config의 window_title로 시작하는 FactoryVoca 창들을 찾기 (뒤에 붙은 번호나 핸들로 구분)"""
+        title = Config.get_value('window_title')
+        windows = [w for w in self.controller.backend.get_windows_with_title(title) if w.title.startswith(title)]
+        if self.worker_count:
+            windows = windows[:self.worker_count]
+        return windows
+
+    @staticmethod
+    def split_shards(days, count):
+        """Day 목록을 count개의 연속된 구간으로 최대한 고르게 나누기"""
+        size, extra = divmod(len(days), count)
+        shards = []
+        start = 0
+        for i in range(count):
+            end = start + size + (1 if i < extra else 0)
+            shards.append(days[start:end])
+            start = end
+        return shards
+
+    def run(self):
+        """병렬 실행 후 결과를 합친다. 모두 성공하면 True"""
+        windows = self.discover_windows()
+        if not windows:
+            self.log("FactoryVoca 창을 찾을 수 없습니다.")
+            return False
+
+        days = list(range(int(self.input_values['day_start']), int(self.input_values['day_end']) + 1))
+        self.controller.select_staging_root(len(days))
+        shards = self.split_shards(days, min(len(windows), len(days)))
+        self.log(f"FactoryVoca 창 {len(shards)}개로 병렬 실행: " +
+                 ", ".join(f"Day {shard[0]}~{shard[-1]}" for shard in shards))
+
+        directories = self.controller.directories
+        run_folder = os.path.join(directories["Staging"], datetime.now().strftime('%Y%m%d_%H%M%S'))
+        focus_lock = threading.RLock()
+
+        workers = []
+        day_owner = {}
+        for index, (window, shard_days) in enumerate(zip(windows, shards), 1):
+            work_folder = os.path.join(directories["Work"], f"shard{index}")
+            os.makedirs(work_folder, exist_ok=True)
+            worker = MacroController(self.controller, window=window, focus_lock=focus_lock,
+                                     work_folder=work_folder)
+            worker.input_values = self.input_values
+            worker.current_day = shard_days[0]
+            worker.staging_folder = os.path.join(run_folder, f"shard{index}")
+            workers.append((worker, shard_days))
+            for day in shard_days:
+                day_owner[day] = worker
+
+        def printing_day():
+            # 공용 정답 폴더에 새로 생긴 답지는 가장 최근에 출력을 시작한 워커의 Day
+            latest = max((worker for worker, _ in workers), key=lambda w: w.printing_since)
+            return latest.printing_day
+
+        def staging_for(day):
+            owner = day_owner.get(day)
+            return owner.staging_folder if owner else run_folder
+
+        watcher = AnswerWatcher(self.controller, directories["Answer"], None, printing_day,
+                                staging_for=staging_for)
+        results = {}
+
+        def run_worker(worker, shard_days):
+            worker.answer_watcher = watcher
+            results[worker] = worker.run_days(shard_days)
+
+        job_id = self.controller.history.start_job(self.input_values)
+        for worker, _ in workers:
+            worker.job_id = job_id
+
+        watcher.start()
+        try:
+            threads = [threading.Thread(target=run_worker, args=(worker, shard_days), daemon=True)
+                       for worker, shard_days in workers]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            answer_files = watcher.stop()
+            completed = all(results.get(worker) for worker, _ in workers)
+            self.controller.history.finish_job(job_id, "completed" if completed else "stopped")
+
+        if not completed:
+            self.log("일부 창의 출력이 실패하여 합치기를 건너뜁니다.")
+            return False
+
+        # 모든 워커의 결과를 Day 순서대로 합치기
+        work_files = {}
+        for worker, _ in workers:
+            work_files.update(worker.work_files)
+        work_files = {day: work_files[day] for day in sorted(work_files)}
+        answer_files = {day: answer_files[day] for day in sorted(answer_files)}
+        missing = self.controller.pdf_manager.missing_answers(work_files, answer_files)
+        if missing:
+            self.log("답지가 없는 Day가 있어 합치기를 건너뜁니다: " + ", ".join(map(str, missing)))
+            return False
+
+        self.controller.macro.input_values = self.input_values
+        self.controller.pdf_manager.merge_all(work_files, answer_files)
+        self.controller.pdf_manager.cleanup_folders(run_folder)
+        return True
+
+def encode_job_values(input_values):
+    """입력값을 JSON으로 보낼 수 있는 형식으로 변환 (WordbookType은 문자열로)"""
+    return {**input_values, 'type': input_values['type'].value}
+
+def decode_job_values(data):
+    """encode_job_values의 역변환"""
+    return {**data, 'type': WordbookType.from_string(data['type'])}
+
+class JobQueue:
+    """코디네이터가 관리하는 단어장 작업 대기열
+
+    워커는 작업을 임대(lease)해 가고, 실행 중에는 heartbeat로 임대를 연장한다.
+    임대 기한이 지나면(워커가 멈추거나 죽으면) 작업은 다시 대기 상태로 돌아간다.
+    """
+    def __init__(self, lease_seconds=60, max_attempts=3):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def add(self, values):
+        with self.lock:
+            job_id = len(self.jobs) + 1
+            self.jobs[job_id] = {
+                'id': job_id, 'values': values, 'status': 'queued', 'worker': None,
+                'lease_expires': 0, 'attempts': 0, 'outputs': [], 'error': None
+            }
+            return job_id
+
+    def lease(self, worker):
+        """대기 중인 첫 작업을 worker에게 임대. 없으면 None"""
+        self.requeue_expired()
+        with self.lock:
+            for job in self.jobs.values():
+                if job['status'] == 'queued':
+                    job.update(status='leased', worker=worker, attempts=job['attempts'] + 1,
+                               lease_expires=time.time() + self.lease_seconds)
+                    return dict(job)
+        return None
+
+    def heartbeat(self, job_id, worker):
+        """임대 연장. 임대가 이미 다른 워커로 넘어갔으면 False"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job or job['status'] != 'leased' or job['worker'] != worker:
+                return False
+            job['lease_expires'] = time.time() + self.lease_seconds
+            return True
+
+    def complete(self, job_id, worker, ok, outputs=None, error=None):
+        """작업 결과 기록. 임대를 잃은 워커의 보고는 무시하고 False 반환"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job or job['status'] != 'leased' or job['worker'] != worker:
+                return False
+            if ok:
+                job.update(status='done', outputs=outputs or [], error=None)
+            else:
+                job['error'] = error
+                job['status'] = 'failed' if job['attempts'] >= self.max_attempts else 'queued'
+                job['worker'] = None
+            return True
+
+    def requeue_expired(self):
+        """임대 기한이 지난 작업을 다시 대기열로"""
+        now = time.time()
+        expired = []
+        with self.lock:
+            for job in self.jobs.values():
+                if job['status'] == 'leased' and job['lease_expires'] < now:
+                    expired.append((job['id'], job['worker']))
+                    job['status'] = 'failed' if job['attempts'] >= self.max_attempts else 'queued'
+                    job['worker'] = None
+        return expired
+
+    def snapshot(self):
+        with self.lock:
+            return [dict(job) for job in self.jobs.values()]
+
+    def is_finished(self):
+        with self.lock:
+            return all(job['status'] in ('done', 'failed') for job in self.jobs.values())
+
+class CoordinatorServer:
+    """JobQueue를 HTTP(JSON)로 제공하는 코디네이터
+
+    POST /lease {worker}            -> {job} 또는 {job: null}
+    POST /heartbeat {job_id, worker} -> {ok}
+    POST /complete {job_id, worker, ok, outputs, error} -> {ok}
+    GET  /jobs                       -> 전체 작업 상태
+    POST /jobs {values}              -> {job_id}
+    """
+    def __init__(self, job_queue, host="127.0.0.1", port=8765, log=print):
+        self.job_queue = job_queue
+        self.log = log
+        coordinator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, status, data):
+                body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/jobs":
+                    self.send_json(200, {'jobs': coordinator.job_queue.snapshot()})
+                else:
+                    self.send_json(404, {'error': "not found"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                    self.send_json(200, coordinator.handle(self.path, request))
+                except KeyError as e:
+                    self.send_json(404 if self.path not in coordinator.routes else 400, {'error': str(e)})
+                except (ValueError, TypeError) as e:
+                    self.send_json(400, {'error': str(e)})
+
+        self.routes = {
+            "/lease": lambda r: {'job': self.job_queue.lease(r['worker'])},
+            "/heartbeat": lambda r: {'ok': self.job_queue.heartbeat(r['job_id'], r['worker'])},
+            "/complete": lambda r: {'ok': self.job_queue.complete(
+                r['job_id'], r['worker'], r['ok'], r.get('outputs'), r.get('error'))},
+            "/jobs": lambda r: {'job_id': self.job_queue.add(r['values'])},
+        }
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+
+    def handle(self, path, request):
+        result = self.routes[path](request)
+        if path == "/lease" and result['job']:
+            self.log(f"작업 {result['job']['id']} 임대: {request['worker']}")
+        elif path == "/complete" and result['ok']:
+            self.log(f"작업 {request['job_id']} {'완료' if request['ok'] else '실패'}: {request['worker']}")
+        return result
+
+    def serve(self, exit_when_done=False, poll_interval=1.0):
+        """서버 실행. 임대 만료 작업을 주기적으로 다시 대기열에 넣는다"""
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        host, port = self.server.server_address[:2]
+        self.log(f"코디네이터 시작: http://{host}:{port}")
+        try:
+            while True:
+                time.sleep(poll_interval)
+                for job_id, worker in self.job_queue.requeue_expired():
+                    self.log(f"작업 {job_id} 임대 만료 ({worker}), 다시 대기열에 넣습니다.")
+                if exit_when_done and self.job_queue.is_finished():
+                    break
+        finally:
+            self.server.shutdown()
+            self.server.server_close()
+
+class CoordinatorClient:
+    """코디네이터 HTTP API 클라이언트"""
+    def __init__(self, url, timeout=10):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def post(self, path, data):
+        request = urllib.request.Request(
+            self.url + path, data=json.dumps(data, ensure_ascii=False).encode('utf-8'),
+            headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def jobs(self):
+        with urllib.request.urlopen(self.url + "/jobs", timeout=self.timeout) as response:
+            return json.loads(response.read())['jobs']
+
+class JobWorker:
+    """코디네이터에서 작업을 임대해 MacroController로 실행하는 워커
+
+    실행 중에는 별도 스레드에서 heartbeat를 보내고, 완료되면 결과 PDF를 공유 출력 폴더로
+    복사한 뒤 보고한다. stall_timeout초 동안 Day 진행이 없으면 (창이 멈춘 경우 등)
+    heartbeat를 멈춰서 임대가 만료되고 다른 워커가 작업을 다시 받게 한다.
+    """
+    def __init__(self, controller, client, shared_output, worker_id=None, heartbeat_interval=10, stall_timeout=300):
+        self.controller = controller
+        self.client = client
+        self.shared_output = shared_output
+        self.worker_id = worker_id or f"{platform.node()}-{os.getpid()}"
+        self.heartbeat_interval = heartbeat_interval
+        self.stall_timeout = stall_timeout
+        self.phase = 0  # 매크로가 끝난 뒤의 단계(최적화 대기, 복사)도 진행으로 센다
+
+    def log(self, message):
+        self.controller.log(message)
+
+    def run(self, exit_when_idle=False, idle_interval=2.0):
+        """작업이 없어질 때까지(또는 계속) 임대와 실행을 반복. 처리한 작업 수 반환"""
+        processed = 0
+        while True:
+            try:
+                job = self.client.post("/lease", {'worker': self.worker_id})['job']
+            except OSError as e:
+                self.log(f"코디네이터 연결 실패: {e}")
+                job = None
+            if job is None:
+                # 다른 워커가 실행 중인 작업은 임대가 만료되면 다시 나올 수 있으므로 모두 끝날 때까지 대기
+                if exit_when_idle and self.all_jobs_finished():
+                    return processed
+                time.sleep(idle_interval)
+                continue
+            self.run_job(job)
+            processed += 1
+
+    def all_jobs_finished(self, retries=5, backoff=1.0):
+        """코디네이터의 작업이 모두 끝났는지 확인 (연결이 안 되면 간격을 늘려 가며 다시 시도)"""
+        for attempt in range(retries):
+            try:
+                return all(job['status'] in ('done', 'failed') for job in self.client.jobs())
+            except OSError as e:
+                delay = backoff * 2 ** attempt
+                self.log(f"코디네이터 연결 실패 ({attempt + 1}/{retries}), {delay:.0f}초 후 다시 시도: {e}")
+                time.sleep(delay)
+        self.log("코디네이터에 연결할 수 없어 종료합니다.")
+        return True
+
+    def run_job(self, job):
+        values = job.get('values') if isinstance(job.get('values'), dict) else {}
+        self.log(f"작업 {job['id']} 시작: {values.get('name')} Day {values.get('day_start')}-{values.get('day_end')}")
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(target=self.send_heartbeats, args=(job['id'], stop_heartbeat), daemon=True)
+        heartbeat.start()
+        outputs, error = [], None
+        try:
+            results = self.controller.macro.start_macro(decode_job_values(job['values']))
+            self.phase += 1
+            if results:
+                # 최적화가 켜져 있으면 끝난 뒤의 파일을 복사
+                self.controller.pdf_manager.optimizer.wait()
+                self.phase += 1
+                outputs = [self.publish(path) for path in results]
+            else:
+                error = "매크로가 완료되지 않았습니다."
+        except Exception as e:
+            error = str(e)
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join()
+
+        report = {'job_id': job['id'], 'worker': self.worker_id, 'ok': error is None,
+                  'outputs': outputs, 'error': error}
+        try:
+            if not self.client.post("/complete", report)['ok']:
+                self.log(f"작업 {job['id']}의 임대가 만료되어 결과가 반영되지 않았습니다.")
+        except OSError as e:
+            self.log(f"작업 {job['id']} 결과 보고 실패: {e}")
+
+    def progress(self):
+        """진행 여부를 비교할 값 (출력 중인 Day, 끝난 Day 수, 병합해서 쓴 크기, 단계)"""
+        metrics = self.controller.metrics
+        return (getattr(self.controller.macro, 'current_day', None), metrics.total('days_completed_total'),
+                metrics.total('output_bytes_total'), self.phase)
+
+    def send_heartbeats(self, job_id, stop_event):
+        last_progress, last_change = self.progress(), time.monotonic()
+        while not stop_event.wait(self.heartbeat_interval):
+            progress = self.progress()
+            if progress != last_progress:
+                last_progress, last_change = progress, time.monotonic()
+            elif time.monotonic() - last_change > self.stall_timeout:
+                self.log(f"작업 {job_id}이(가) {self.stall_timeout:.0f}초 동안 진행되지 않아 heartbeat를 멈춥니다 "
+                         "(임대가 만료되면 다른 워커가 다시 실행)")
+                return
+            try:
+                if not self.client.post("/heartbeat", {'job_id': job_id, 'worker': self.worker_id})['ok']:
+                    self.log(f"작업 {job_id}의 임대를 잃었습니다.")
+                    return
+            except OSError as e:
+                self.log(f"heartbeat 실패: {e}")
+
+    def publish(self, pdf_path):
+        """결과 PDF와 인덱스 파일(있으면)을 공유 출력 폴더에 원자적으로 복사"""
+        os.makedirs(self.shared_output, exist_ok=True)
+        target = os.path.join(self.shared_output, os.path.basename(pdf_path))
+        # 인덱스를 먼저 복사해서 PDF가 보일 때는 인덱스도 있도록
+        index_path = MergedBook(pdf_path).index_path
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as source, atomic_output(MergedBook(target).index_path) as f:
+                shutil.copyfileobj(source, f)
+        with open(pdf_path, "rb") as source, atomic_output(target) as f:
+            shutil.copyfileobj(source, f)
+        self.phase += 1
+        return target
+
+def parse_deadline(text):
+    """'18:00' 또는 '2024-03-05 18:00' 형식의 마감 시각을 타임스탬프로 (비어 있으면 None)"""
+    text = (text or "").strip()
+    if not text:
+        return None
+    for fmt in ('%Y-%m-%d %H:%M', '%H:%M'):
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        if fmt == '%H:%M':
+            parsed = datetime.combine(datetime.now().date(), parsed.time())
+        return parsed.timestamp()
+    raise ValueError(f"마감 시각 형식이 올바르지 않습니다: {text}")
+
+class ScheduledJob:
+    """스케줄러의 작업 하나 (우선순위가 클수록 먼저 실행)"""
+    def __init__(self, job_id, input_values, priority=0, deadline=None):
+        self.id = job_id
+        self.input_values = input_values
+        self.priority = priority
+        self.deadline = deadline
+        self.status = "대기"
+        self.state = None       # 양보로 멈췄을 때의 진행 상태 (MacroController.saved_state)
+        self.results = None
+
+    @property
+    def total_days(self):
+        return int(self.input_values['day_end']) - int(self.input_values['day_start']) + 1
+
+    def remaining_days(self, current_day=None):
+        """남은 Day 수 (실행 중이면 current_day부터)"""
+        if current_day is not None:
+            return int(self.input_values['day_end']) - current_day + 1
+        return self.total_days - (len(self.state['work_files']) if self.state else 0)
+
+    def sort_key(self):
+        # 우선순위 높은 순, 마감이 이른 순, 먼저 들어온 순 (멈춘 작업은 원래 순번 유지)
+        return (-self.priority, self.deadline or float('inf'), self.id)
+
+class JobScheduler:
+    """우선순위와 마감 시각이 있는 단어장 작업 대기열
+
+    실행 중인 작업보다 우선순위가 높은 작업이 들어오면 MacroController가 다음 Day 경계에서
+    멈추고 진행 상태(끝난 Day, 병합 전 파일 목록)를 남긴다. 급한 작업이 끝나면 멈췄던 작업을
+    그 상태에서 이어서 실행한다.
+    """
+    def __init__(self, controller):
+        self.controller = controller
+        self.jobs = []
+        self.current = None
+        self.running = False
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def log(self, message):
+        self.controller.log(message)
+
+    def submit(self, input_values, priority=0, deadline=None):
+        job = ScheduledJob(next(self._ids), input_values, priority, deadline)
+        with self.lock:
+            self.jobs.append(job)
+            current = self.current
+        self.log(f"작업 {job.id} 추가: {input_values['name']} (우선순위 {priority})")
+        if current and priority > current.priority:
+            self.log(f"다음 Day 경계에서 작업 {current.id} 멈춤, 작업 {job.id} 먼저 실행")
+        return job
+
+    def pending(self):
+        """실행 순서대로 정렬된 대기 작업"""
+        with self.lock:
+            return sorted((job for job in self.jobs if job.status in ("대기", "멈춤")), key=ScheduledJob.sort_key)
+
+    def should_yield(self):
+        with self.lock:
+            current = self.current
+            return any(job.priority > current.priority for job in self.jobs
+                       if job.status in ("대기", "멈춤") and job is not current)
+
+    def run(self):
+        """대기 작업이 없어질 때까지 실행"""
+        macro = self.controller.macro
+        self.running = True
+        try:
+            while True:
+                pending = self.pending()
+                if not pending:
+                    return
+                job = pending[0]
+                with self.lock:
+                    self.current = job
+                job.status = "실행 중"
+                resumed = job.state is not None
+                self.log(f"작업 {job.id} {'이어서 ' if resumed else ''}시작: {job.input_values['name']}")
+                macro.should_yield = self.should_yield
+                # 작업마다 work 하위 폴더를 따로 써서, 이름/유형/버전이 같은 멈춘 작업의 Day PDF를
+                # 급한 작업의 정리 단계에서 지우지 않게 한다
+                job_folder = os.path.join(self.controller.directories["Work"], f"job{job.id}")
+                os.makedirs(job_folder, exist_ok=True)
+                macro.work_folder = job_folder
+                try:
+                    job.results = macro.start_macro(job.input_values, resume=job.state)
+                finally:
+                    macro.should_yield = None
+                    macro.work_folder = None
+                    with self.lock:
+                        self.current = None
+                if macro.preempted:
+                    job.state, job.status = macro.saved_state, "멈춤"
+                else:
+                    job.status = "완료" if job.results else "실패"
+                    if job.results:
+                        shutil.rmtree(job_folder, ignore_errors=True)
+                    if job.status == "실패":
+                        return  # 중단/오류 (남은 작업은 대기열에 그대로)
+        finally:
+            self.running = False
+
+    def predict(self):
+        """[(작업, 예상 완료 시각, 마감을 넘기는지)]를 실행 순서대로 반환 (예측할 수 없으면 시각은 None)"""
+        with self.lock:
+            current = self.current
+        order = ([current] if current else []) + [job for job in self.pending() if job is not current]
+        eta = time.time()
+        predictions = []
+        for job in order:
+            day_seconds = self.controller.history.average_day_seconds(platform.node(), job.input_values['type'])
+            if eta is None or day_seconds is None:
+                eta = None  # 앞 작업을 모르면 뒤 작업도 예측할 수 없음
+            else:
+                current_day = self.controller.macro.current_day if job is current else None
+                eta += job.remaining_days(current_day) * day_seconds
+            predictions.append((job, eta, bool(eta and job.deadline and eta > job.deadline)))
+        return predictions
+
+class DelayTuner:
+    """딜레이를 이 PC에 맞게 줄이는 보정 루틴
+
+    연습용 Day 범위를 실제로 출력(선택/추가/불러오기/출력)하고, 병합된 PDF의 Day 머리글로
+    결과를 확인한다. 딜레이마다 trials번 모두 성공하는 가장 작은 값을 이분 탐색으로 찾고,
+    안전 여유(margin)를 곱해 delay_profiles/<PC 이름>.json에 저장한다.
+    """
+    TUNABLE = ('click', 'arrow_key', 'page_down', 'load_day', 'print_btn',
+               'input_filename', 'print_duration', 'output_path', 'paste')
+
+    def __init__(self, controller, day_start, day_end, trials=3, keys=None, steps=5, margin=1.2):
+        self.controller = controller
+        self.day_start = day_start
+        self.day_end = day_end
+        self.trials = trials
+        self.keys = keys or self.TUNABLE
+        self.steps = steps
+        self.margin = margin
+
+    def log(self, message):
+        self.controller.log(message)
+
+    def job_values(self):
+        return {'name': "__tune__", 'type': WordbookType.ORIGINAL, 'version': None,
+                'day_start': str(self.day_start), 'day_end': str(self.day_end)}
+
+    def trial(self, delays):
+        """한 번 출력해 보고 (성공 여부, 소요 초) 반환"""
+        macro = self.controller.macro
+        overrides = {
+            'delays': delays, 'delay_profile': "",
+            # 실패한 시도가 오래 걸리지 않도록 대기 시간 제한, 추가 출력은 끔
+            'dialog_timeout': 10, 'export_timeout': 10, 'merge_outputs': {}, 'optimize_output': False
+        }
+        reprints_before = self.controller.metrics.total('reprints_total')
+        start_time = time.perf_counter()
+        # 보정 시도는 실제 작업이 아니므로 실행 기록(예상 시간 계산)에 넣지 않는다
+        macro.record_history = False
+        try:
+            with Config.override(overrides):
+                results = macro.start_macro(self.job_values())
+        finally:
+            macro.record_history = True
+        seconds = time.perf_counter() - start_time
+        reprinted = self.controller.metrics.total('reprints_total') > reprints_before
+        ok = bool(results) and not reprinted and all(self.verify(path) for path in results)
+        if results:
+            for path in results:
+                for file_path in (path, MergedBook(path).index_path):
+                    if os.path.exists(file_path):
+                        os.unlink(file_path)
+        else:
+            self.recover()
+        return ok, seconds
+
+    def verify(self, pdf_path):
+        """병합본의 Day 구성과 각 Day 첫 페이지 머리글 확인"""
+        entries = MergedBook(pdf_path).load_index()['entries']
+        if [entry['day'] for entry in entries] != list(range(self.day_start, self.day_end + 1)):
+            return False
+        if not Config.get_value('day_header_pattern'):
+            return True
+        reader = PdfReader(pdf_path, strict=False)
+        for entry in entries:
+            text = reader.pages[entry['first_page'] - 1].extract_text() or ""
+            if not re.search(DayVerifier.header_pattern(entry['day']), text):
+                return False
+        return True
+
+    def recover(self):
+        """실패한 시도 뒤 열린 출력 대화상자를 닫고 작업 파일 정리"""
+        macro = self.controller.macro
+        print_title = Config.get_value('print_title')
+        for window in macro.backend.get_windows_with_title(print_title):
+            if window.title == print_title:
+                macro.backend.activate(window)
+                macro.backend.press('esc')
+        macro.backend.sleep(1.0)
+        # 대화상자를 취소했으므로 출력 경로와 불러온 Day는 모르는 상태로 둔다
+        self.controller.sessions.forget(macro.session, 'output_path', 'loaded_day')
+        if getattr(macro, 'staging_folder', None) and os.path.isdir(macro.staging_folder):
+            self.controller.pdf_manager.cleanup_folders(macro.staging_folder)
+
+    def run_trials(self, delays):
+        """trials번 모두 성공하면 (True, 평균 초), 하나라도 실패하면 바로 (False, None)"""
+        durations = []
+        for _ in range(self.trials):
+            ok, seconds = self.trial(delays)
+            if not ok:
+                return False, None
+            durations.append(seconds)
+        return True, sum(durations) / len(durations)
+
+    def tune(self):
+        """보정 실행. 결과 dict 반환 (현재 딜레이로도 실패하면 None)"""
+        baseline = {key: Config.get_delay(key) for key in self.keys}
+        self.log(f"기준 딜레이 측정: {baseline}")
+        ok, baseline_seconds = self.run_trials(baseline)
+        if not ok:
+            self.log("현재 딜레이로도 출력에 실패합니다. 좌표와 설정을 먼저 확인하세요.")
+            return None
+
+        tuned = dict(baseline)
+        for key in self.keys:
+            low, high = 0.0, tuned[key]
+            for _ in range(self.steps):
+                middle = round((low + high) / 2, 3)
+                ok, _ = self.run_trials({**tuned, key: middle})
+                if ok:
+                    high = middle
+                else:
+                    low = middle
+            tuned[key] = round(min(baseline[key], high * self.margin), 3)
+            self.log(f"{key}: {baseline[key]} -> {tuned[key]}")
+
+        ok, tuned_seconds = self.run_trials(tuned)
+        if not ok:
+            self.log("줄인 딜레이 조합이 검증에 실패해 기준 딜레이를 유지합니다.")
+            tuned, tuned_seconds = baseline, baseline_seconds
+
+        result = {
+            'machine': platform.node(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'config_version': Config.get_version(),
+            'days': f"{self.day_start}-{self.day_end}",
+            'trials': self.trials,
+            'margin': self.margin,
+            'delays': tuned,
+            'baseline_delays': baseline,
+            'baseline_seconds': round(baseline_seconds, 3),
+            'tuned_seconds': round(tuned_seconds, 3),
+            'speedup': round(baseline_seconds / tuned_seconds, 2) if tuned_seconds else None
+        }
+        return result
+
+    def save(self, result, path=None):
+        path = path or Config.get_delay_profile_path() or os.path.join("delay_profiles", f"{platform.node()}.json")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with atomic_output(path) as f:
+            f.write(json.dumps(result, ensure_ascii=False, indent=2).encode('utf-8'))
+        return path
+
+class SoakMonitor:
+    """긴 실행에서 자원 사용량이 Day 수에 따라 늘어나는지 재는 클래스 (soak 모드)
+
+    every Day마다 표본을 CSV 한 줄로 쓰고, 끝나면 항목마다 Day 수에 대한 직선을 맞춰
+    꾸준히 늘어나는 항목을 찾는다. work/스테이징 폴더 크기는 작업 중에는 병합 전까지
+    늘어나는 것이 정상이므로 작업이 끝나 병합/정리된 뒤(sample_folders)에만 잰다.
+    """
+    COLUMNS = ('time', 'elapsed_seconds', 'days', 'rss_mb', 'open_handles', 'gdi_objects', 'user_objects',
+               'threads', 'log_lines', 'day_seconds', 'window_enumerations_per_day', 'work_mb')
+    TRENDS = COLUMNS[3:]
+
+    def __init__(self, controller, every, csv_path):
+        self.controller = controller
+        self.every = every
+        self.csv_path = csv_path
+        self.rows = []
+        self.days = 0
+        self.started_at = self.last_time = time.time()
+        self.last_days = 0
+        self.last_enumerations = 0
+        os.makedirs(os.path.dirname(csv_path) or ".", exist_ok=True)
+        self.file = open(csv_path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=self.COLUMNS)
+        self.writer.writeheader()
+        self.sample()
+
+    def on_day(self, day):
+        """MacroController.day_observer"""
+        self.days += 1
+        if self.days % self.every == 0:
+            self.sample()
+
+    @staticmethod
+    def process_usage():
+        """(RSS MB, 열린 핸들/파일 수, GDI 개체 수, USER 개체 수) 중 잴 수 있는 것"""
+        rss_mb = handles = gdi = user = None
+        if psutil:
+            process = psutil.Process()
+            rss_mb = process.memory_info().rss / (1024 * 1024)
+            handles = process.num_handles() if sys.platform == 'win32' else process.num_fds()
+        elif os.path.exists('/proc/self/statm'):
+            with open('/proc/self/statm') as f:
+                rss_mb = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+            handles = len(os.listdir('/proc/self/fd'))
+        if sys.platform == 'win32':
+            # 창/그리기 핸들은 프로세스 핸들 수와 따로 센다
+            current = ctypes.windll.kernel32.GetCurrentProcess()
+            gdi = ctypes.windll.user32.GetGuiResources(current, 0)
+            user = ctypes.windll.user32.GetGuiResources(current, 1)
+        return rss_mb, handles, gdi, user
+
+    def folder_mb(self):
+        """work 폴더와 스테이징 폴더의 파일 크기 합계"""
+        total = 0
+        for folder in (self.controller.directories["Work"], self.controller.directories["Staging"]):
+            for root, _, files in os.walk(folder):
+                for name in files:
+                    try:
+                        total += os.path.getsize(os.path.join(root, name))
+                    except OSError:
+                        pass
+        return total / (1024 * 1024)
+
+    def log_lines(self):
+        """디버그 창 로그 줄 수 (Tk 위젯이므로 메인 스레드에서 읽음, 창이 없으면 None)"""
+        debug_window = self.controller.debug_window
+        if not debug_window:
+            return None
+        return self.controller.ui.call(lambda: int(debug_window.log_area.index('end-1c').split('.')[0]))
+
+    def write_row(self, row):
+        row = {key: round(row[key], 3) if isinstance(row.get(key), float) else row.get(key) for key in self.COLUMNS}
+        self.rows.append(row)
+        self.writer.writerow(row)
+        self.file.flush()
+        return row
+
+    def sample(self):
+        now = time.time()
+        rss_mb, handles, gdi, user = self.process_usage()
+        enumerations = self.controller.metrics.total('window_enumerations_total')
+        days = self.days - self.last_days
+        row = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'elapsed_seconds': round(now - self.started_at, 1),
+            'days': self.days,
+            'rss_mb': rss_mb,
+            'open_handles': handles,
+            'gdi_objects': gdi,
+            'user_objects': user,
+            'threads': threading.active_count(),
+            'log_lines': self.log_lines(),
+            'day_seconds': (now - self.last_time) / days if days else None,
+            'window_enumerations_per_day': (enumerations - self.last_enumerations) / days if days else None,
+            'work_mb': None
+        }
+        row = self.write_row(row)
+        self.last_time, self.last_days, self.last_enumerations = now, self.days, enumerations
+        if self.days:
+            self.controller.log("soak 표본: " + ", ".join(
+                f"{key}={row[key]}" for key in self.TRENDS if row[key] is not None))
+
+    def sample_folders(self):
+        """작업 하나가 끝난 뒤(병합/정리 후) 남은 work/스테이징 폴더 크기 표본"""
+        row = self.write_row({
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'elapsed_seconds': round(time.time() - self.started_at, 1),
+            'days': self.days,
+            'work_mb': self.folder_mb()
+        })
+        self.controller.log(f"soak 표본: work_mb={row['work_mb']}")
+
+    def close(self):
+        self.file.close()
+
+    @staticmethod
+    def fit(xs, ys):
+        """최소제곱 직선 -> (기울기, 절편, 결정계수)"""
+        n = len(xs)
+        mean_x, mean_y = sum(xs) / n, sum(ys) / n
+        sxx = sum((x - mean_x) ** 2 for x in xs)
+        sxy = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+        syy = sum((y - mean_y) ** 2 for y in ys)
+        slope = sxy / sxx if sxx else 0.0
+        r2 = (sxy * sxy) / (sxx * syy) if sxx and syy else 0.0
+        return slope, mean_y - slope * mean_x, r2
+
+    def trends(self, threshold=0.1, min_r2=0.8):
+        """항목별 [(항목, 처음 값, 끝 값, 증가율, 결정계수, 의심 여부), ...]
+
+        맞춘 직선이 실행 동안 threshold(비율) 넘게 오르고 결정계수가 min_r2 이상이면
+        (들쭉날쭉하지 않고 꾸준히 늘면) 의심 항목으로 표시한다. 시작 직후 표본(Day 0)은
+        스레드/파일이 아직 열리기 전이라 추세에서 뺀다.
+        """
+        results = []
+        for column in self.TRENDS:
+            points = [(row['days'], row[column]) for row in self.rows if row['days'] and row[column] is not None]
+            if len(points) < 3:
+                continue
+            xs, ys = zip(*points)
+            slope, intercept, r2 = self.fit(xs, ys)
+            first, last = intercept + slope * xs[0], intercept + slope * xs[-1]
+            growth = (last - first) / abs(first) if first else (float('inf') if last > first else 0.0)
+            results.append((column, first, last, growth, r2, growth > threshold and r2 >= min_r2))
+        return results
+
+class SessionTracker:
+    """FactoryVoca 창별 화면 상태를 기억해 바뀌어야 하는 조작만 하도록 돕는 클래스
+
+    체크박스 상태는 session_state.json에 창 핸들별로 저장해 프로그램을 다시 켜도 이어서 쓴다.
+    FactoryVoca를 다시 켜면 핸들이 바뀌므로 처음 상태(INITIAL)부터 시작한다. 모르는 값은
+    None이고, config의 state_probes에 체크박스 위치와 체크됐을 때의 색을 적어 두면
+    작업을 시작할 때 화면에서 다시 확인한다. 화면에서 확인할 수 없는 나머지 항목은
+    작업 사이에 사용자가 바꿀 수 있으므로 작업마다 처음부터 다시 맞춘다.
+    파일 저장은 update마다 하지 않고 Day 경계와 작업 끝에서 save로 한 번에 한다.
+    """
+    # FactoryVoca를 처음 켰을 때의 상태
+    INITIAL = {
+        'auto_answer_save': False,
+        'show_first_letter': False,
+        'word_count': None,
+        'eng_to_kor': None,
+        'output_path': None,
+        'selected_days': None,
+        'loaded_day': None
+    }
+    CHECKBOXES = ('auto_answer_save', 'show_first_letter')
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.path = Config.get_value('session_state_file') or "session_state.json"
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.dirty = False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.saved = json.load(f)
+        except (OSError, ValueError):
+            self.saved = {}
+
+    @staticmethod
+    def key_for(window):
+        """저장에 쓰는 창 키 (가상 창은 실행마다 새로 만들어지므로 None이라 저장하지 않음)"""
+        if isinstance(window, SimulatedWindow):
+            return None
+        handle = getattr(window, '_hWnd', None)
+        return str(handle) if handle else None
+
+    def session_for(self, window):
+        """창의 상태 dict (같은 창이면 같은 객체)"""
+        key = self.key_for(window)
+        with self.lock:
+            session_key = key or id(window)
+            if session_key not in self.sessions:
+                self.sessions[session_key] = {**self.INITIAL, **self.saved.get(key, {})} if key else dict(self.INITIAL)
+                self.sessions[session_key]['_key'] = key
+            return self.sessions[session_key]
+
+    def update(self, session, **values):
+        with self.lock:
+            session.update(values)
+            if session['_key']:
+                self.dirty = True
+
+    def forget(self, session, *fields):
+        """fields를 모르는 상태로 (다음에 반드시 다시 조작)"""
+        self.update(session, **{field: None for field in fields})
+
+    def save(self):
+        """바뀐 체크박스 상태가 있으면 파일에 저장"""
+        with self.lock:
+            if not self.dirty:
+                return
+            for session in self.sessions.values():
+                if session['_key']:
+                    self.saved[session['_key']] = {field: session[field] for field in self.CHECKBOXES}
+            data = json.dumps(self.saved, ensure_ascii=False, indent=2).encode('utf-8')
+            self.dirty = False
+        try:
+            with atomic_output(self.path) as f:
+                f.write(data)
+        except OSError as e:
+            self.controller.log(f"세션 상태를 저장할 수 없습니다: {e}")
+
+    def verify(self, session, window, backend):
+        """state_probes가 있는 체크박스는 픽셀 색으로 실제 상태 확인"""
+        probes = Config.get_value('state_probes') or {}
+        for field in self.CHECKBOXES:
+            probe = probes.get(field)
+            if not probe or window is None:
+                continue
+            x, y = probe['position']
+            color = backend.pixel(window.left + x, window.top + y)
+            tolerance = probe.get('tolerance', 16)
+            checked = all(abs(actual - expected) <= tolerance for actual, expected in zip(color, probe['color']))
+            if session[field] is not None and session[field] != checked:
+                self.controller.log(f"FactoryVoca 상태가 기억과 다릅니다: {field} = {checked}")
+            self.update(session, **{field: checked})
+
+    @classmethod
+    def plan(cls, session, desired):
+        """원하는 값과 다른 항목만 [(항목, 값), ...]으로
+
+        상태를 모르는 체크박스는 누르면 오히려 반대로 될 수 있으므로 넣지 않는다.
+        """
+        return [(field, value) for field, value in desired.items()
+                if session.get(field) != value and not (field in cls.CHECKBOXES and session.get(field) is None)]
+
+class TextEntry:
+    """문자열을 클립보드 붙여넣기 한 번으로 입력하는 서비스
+
+    입력 전 사용자의 클립보드를 저장했다가 되돌리고, verify가 켜져 있으면 전체 선택 후
+    복사해서 붙여넣기가 실제로 들어갔는지 확인한다. 확인에 실패하면 한 글자씩 입력한다.
+    """
+    def __init__(self, macro):
+        self.macro = macro
+
+    @property
+    def backend(self):
+        return self.macro.backend
+
+    def enter(self, text, verify=None):
+        """현재 포커스가 있는 입력 필드에 text 입력. 성공하면 True"""
+        if verify is None:
+            verify = Config.get_value('verify_paste') is not False
+        saved = self.backend.get_clipboard()
+        try:
+            self.backend.copy(text)
+            self.backend.hotkey('ctrl', 'v')
+            # 대상 프로그램이 클립보드를 읽을 시간을 준 뒤에 되돌린다
+            self.backend.sleep(Config.get_delay('paste'))
+            if not verify or self._confirm(text):
+                return True
+
+            self.macro.log(f"붙여넣기 확인 실패, 직접 입력합니다: {text}")
+            if not text.isascii():
+                # pyautogui.write는 한글 등 ASCII가 아닌 문자를 입력할 수 없다
+                self.macro.log("ASCII가 아닌 문자가 있어 직접 입력할 수 없습니다.")
+                return False
+            self.backend.hotkey('ctrl', 'a')
+            self.backend.write(text)
+            return self._confirm(text) if verify else True
+        finally:
+            if saved is not None:
+                self.backend.copy(saved)
+
+    def _confirm(self, text):
+        """필드 내용을 전체 선택 후 복사해서 text와 비교"""
+        self.backend.hotkey('ctrl', 'a')
+        self.backend.hotkey('ctrl', 'c')
+        self.backend.sleep(Config.get_delay('paste'))
+        landed = self.backend.get_clipboard()
+        self.backend.press('end')  # 선택 해제
+        return landed == text
+
+class MacroController:
+    def __init__(self, controller: Controller, backend=None, window=None, focus_lock=None, work_folder=None):
+        self.controller = controller
+        
+        # GUI 조작 백엔드 (기본값: 컨트롤러의 백엔드)
+        self.backend = backend or controller.backend
+        # 병렬 실행 시 이 워커가 맡은 FactoryVoca 창 (없으면 제목으로 찾음)
+        self.window = window
+        # 마우스/키보드 포커스를 워커끼리 나눠 쓰기 위한 잠금
+        self.focus_lock = focus_lock or threading.RLock()
+        # 이 워커의 출력 폴더 (없으면 컨트롤러의 work 폴더)
+        self.work_folder = work_folder
+        
+        # 이 워커가 조작하는 FactoryVoca 창의 상태 (run_days에서 창을 찾으면 그 창의 상태로 바뀜)
+        self.session = controller.sessions.session_for(window)
+        
+        # 클립보드 붙여넣기로 문자열을 입력하는 서비스
+        self.text_entry = TextEntry(self)
+        
+        # 마지막으로 출력을 시작한 Day (병렬 실행 시 답지를 어느 워커에 묶을지 판단)
+        self.printing_day = None
+        self.printing_since = 0
+        
+        # 스케줄러가 넣어 주는 양보 판단 함수 (True를 돌려주면 다음 Day 경계에서 멈추고 상태 저장)
+        self.should_yield = None
+        self.preempted = False
+        self.saved_state = None
+        
+        # Day 하나를 마칠 때마다 Day 번호로 호출할 함수 (soak 모드의 표본 수집)
+        self.day_observer = None
+        
+        # False면 실행 기록(RunHistory)에 남기지 않음 (딜레이 보정 시도 등)
+        self.record_history = True
+
+    def log(self, message):
         """컨트롤러의 로그 기능 사용"""
         self.controller.log(message)
         
@@ -835,11 +3994,26 @@ class MacroController:
         if Config.is_debug_mode():
             self.log(message)
 
-    def start_macro(self):
-        """매크로 시작"""
+    def get_work_folder(self):
+        """Day PDF가 출력될 폴더"""
+        return self.work_folder or self.controller.directories["Work"]
+
+    def start_macro(self, input_values=None, resume=None):
+        """매크로 시작 (디버그 창에서 프로파일러를 켜 두었으면 측정)"""
+        with self.controller.profiler.section('macro'):
+            return self.run_macro(input_values, resume)
+
+    def run_macro(self, input_values=None, resume=None):
+        """매크로 실행
+
+        resume은 양보로 멈췄던 작업의 saved_state로, 끝난 Day는 건너뛰고 같은 스테이징
+        폴더를 이어서 쓴다.
+        """
         self.debug_log("매크로 시작")
+        self.preempted = False
+        self.saved_state = None
         
-        self.input_values = self.controller.view.get_input_values()
+        self.input_values = input_values or self.controller.view.get_input_values()
         if self.input_values is None:
             self.log("입력 값이 유효하지 않습니다. 매크로를 중단합니다.")
             return
@@ -847,99 +4021,374 @@ class MacroController:
             day_start = int(self.input_values['day_start'])
             day_end = int(self.input_values['day_end'])
         except ValueError:
-            messagebox.showerror("치명적인 오류", "Day 범위에는 숫자만 입력 가능합니다.")
+            self.controller.show_error("치명적인 오류", "Day 범위에는 숫자만 입력 가능합니다.")
             self.stop_macro(f"Day 범위에는 숫자만 입력 가능합니다.")
             return
+        
+        # 직접 출력 엔진이면 FactoryVoca 창을 조작하지 않는다
+        if Config.get_value('engine') == 'native':
+            return self.controller.renderer.run(self, day_start, day_end)
+        
+        # UI 없이 실행하면 사전 점검에서 실패한 항목이 있을 때 중단 (UI에서는 시작 버튼에서 확인)
+        if self.controller.view is None and self.window is None:
+            failed = [Preflight.ITEMS[item_id] for item_id, (ok, _) in self.controller.preflight.run().items()
+                      if ok is False]
+            if failed:
+                self.stop_macro("사전 점검 실패: " + ", ".join(failed))
+                return
+        
+        resume = resume or {'work_files': {}, 'answer_files': {}}
+        days = [day for day in range(day_start, day_end + 1) if day not in resume['work_files']]
+        
+        # 이번 실행의 Day 수만큼 RAM 스테이징 여유 공간이 있는지 다시 확인
+        if 'staging_folder' not in resume:
+            self.controller.select_staging_root(len(days))
                 
-        for day in range(day_start, day_end + 1):
-            self.current_day = day
-            
-            if self.input_values['type'] == WordbookType.ORIGINAL:
-                self.click_selected_day()
+        self.current_day = days[0] if days else day_start
+        
+        # 이번 실행 전용 답지 스테이징 폴더 (이어서 실행하면 멈췄던 작업의 폴더)
+        self.staging_folder = resume.get('staging_folder') or os.path.join(
+            self.controller.directories["Staging"], datetime.now().strftime('%Y%m%d_%H%M%S_%f'))
+        self.answer_watcher = AnswerWatcher(
+            self.controller,
+            self.controller.directories["Answer"],
+            self.staging_folder,
+            lambda: self.current_day
+        )
+        self.answer_watcher.start()
+        
+        self.job_id = self.controller.history.start_job(self.input_values) if self.record_history else None
+        completed = False
+        try:
+            completed = self.run_days(days)
+        finally:
+            answer_files = self.answer_watcher.stop()
+            status = "completed" if completed else "stopped"
+            if self.job_id is not None:
+                self.controller.history.finish_job(self.job_id, "preempted" if completed and self.preempted else status)
+        
+        if not completed:
+            return None
+        
+        # 앞서 끝낸 Day와 합쳐서 Day 순서로 정리
+        work_files = {**resume['work_files'], **self.work_files}
+        answer_files = {**resume['answer_files'], **answer_files}
+        work_files = {day: work_files[day] for day in sorted(work_files)}
+        answer_files = {day: answer_files[day] for day in sorted(answer_files)}
+        
+        if self.preempted:
+            # 병합하지 않고 진행 상태만 남겨서 나중에 이어서 실행
+            self.saved_state = {'staging_folder': self.staging_folder,
+                                'work_files': work_files, 'answer_files': answer_files}
+            self.log(f"더 급한 작업을 위해 멈춥니다 (Day {len(work_files)}개 완료, 이어서 실행 예정)")
+            return None
+        
+        missing = self.controller.pdf_manager.missing_answers(work_files, answer_files)
+        if missing:
+            # 답지가 빠진 채로 병합하지 않는다 (Day 파일은 남겨 두어 원인을 확인할 수 있게)
+            self.stop_macro("답지가 없는 Day: " + ", ".join(map(str, missing)))
+            return None
                 
-                self.remove_selected_day()
+        results = self.controller.pdf_manager.merge_all(work_files, answer_files)
+        # 스케줄러로 실행 중이면 멈춰 있는 다른 작업의 Day PDF는 남겨 둠
+        self.controller.pdf_manager.cleanup_folders(self.staging_folder, work_files if self.should_yield else None)
+        return results
+
+    def run_days(self, days):
+        """Day 목록을 차례로 출력하고 검사. 중간에 중단되면 False 반환
+
+        answer_watcher는 호출하는 쪽에서 미리 만들어 두어야 한다.
+        """
+        # 출력된 Day PDF 검사 및 재출력 대기열
+        self.work_files = {}
+        self.reprint_queue = queue.Queue()
+        self.reprint_counts = {}
+        self.pdf_validator = PdfValidator(self.controller, self.request_reprint)
+        self.day_verifier = DayVerifier(self.controller, self.request_reprint)
+        
+        # 출력 완료 대기 (동시에 진행할 수 있는 출력 수 제한)
+        max_inflight = Config.get_value('max_inflight_exports', 2)
+        self.export_slots = threading.BoundedSemaphore(max_inflight)
+        self.export_waiter = ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix="export-waiter")
+        self.export_futures = []
+        
+        days = list(days)
+        started_at = time.time()
+        
+        if not self.prepare_session():
+            self.stop_macro("FactoryVoca 설정 실패")
+            return False
+        
+        try:
+            for done, day in enumerate(days, 1):
+                self.current_day = day
                 
-                # 단어 선택
-                if not self.select_day(day):
-                    self.stop_macro(f"Day {day} 선택 실패")
-                    return
+                # Day 경계에서 config.json 변경 반영 (좌표/딜레이 실행 중 조정)
+                if Config.reload_if_changed(self.log):
+                    self.log("config.json 변경 사항을 반영했습니다.")
                 
-                self.add_selected_day()
+                with self.timed_step(day, 'day'):
+                    if not self.process_day(day):
+                        self.stop_macro(f"Day {day} 선택 실패")
+                        return False
+                self.controller.metrics.inc('days_completed_total')
+                self.controller.sessions.save()
+                if self.day_observer:
+                    self.day_observer(day)
                 
-                self.load_day()
+                if self.window is None:
+                    self.controller.report_progress(day, done, len(days), started_at, self.input_values['type'])
                 
-                pyautogui.sleep(3)
+                # 앞서 검사에 실패한 Day는 근처에 있을 때 바로 재출력
+                if not self.drain_reprints():
+                    return False
                 
-                self.print_wordbook()
+                # 더 급한 작업이 기다리면 Day 경계에서 양보 (진행 중인 출력/검사는 마저 끝냄)
+                if self.should_yield and done < len(days) and self.should_yield():
+                    self.preempted = True
+                    break
+            
+            # 남은 검사를 기다리며 실패한 Day가 없어질 때까지 재출력
+            while True:
+                wait_futures(self.export_futures)
+                self.pdf_validator.wait()
+                self.day_verifier.wait()
+                if self.reprint_queue.empty():
+                    break
+                if not self.drain_reprints():
+                    return False
+        finally:
+            self.export_waiter.shutdown(wait=True)
+            self.pdf_validator.shutdown()
+            self.day_verifier.shutdown()
+            self.controller.sessions.save()
+        return True
+
+    @contextmanager
+    def timed_step(self, day, step):
+        """블록의 소요 시간을 작업 기록에 남기기"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.controller.metrics.observe('step_seconds', duration, step=step)
+            if getattr(self, 'job_id', None) is not None:
+                self.controller.history.record_step(self.job_id, day, step, duration)
+
+    def request_reprint(self, day, reason):
+        """검사에 실패한 Day를 재출력 대기열에 넣기 (워커 스레드에서 호출됨)"""
+        self.reprint_queue.put((day, reason))
+
+    def drain_reprints(self):
+        """재출력 대기열의 Day들을 다시 출력. 재시도 한도를 넘으면 매크로 중단"""
+        max_reprints = Config.get_value('max_reprints', 2)
+        pending = {}
+        while not self.reprint_queue.empty():
+            day, reason = self.reprint_queue.get()
+            # 검사와 머리글 확인이 같은 Day를 동시에 요청하면 한 번만 재출력
+            pending.setdefault(day, reason)
+        
+        for day, reason in pending.items():
+            self.reprint_counts[day] = self.reprint_counts.get(day, 0) + 1
+            if self.reprint_counts[day] > max_reprints:
+                self.stop_macro(f"Day {day} 재출력 한도 초과 ({reason})")
+                return False
+            
+            self.log(f"Day {day} 재출력 ({self.reprint_counts[day]}/{max_reprints}): {reason}")
+            self.controller.metrics.inc('reprints_total')
+            self.current_day = day
+            # 잘못 출력됐으면 Day 목록 상태도 믿을 수 없으므로 처음부터 다시 선택
+            self.controller.sessions.forget(self.session, 'selected_days', 'loaded_day')
+            if not self.process_day(day):
+                self.stop_macro(f"Day {day} 선택 실패")
+                return False
+        return True
+
+    def process_day(self, day):
+        """Day 하나를 선택하고 출력"""
+        if self.input_values['type'] == WordbookType.ORIGINAL:
+            sessions = self.controller.sessions
+            with self.focus_lock, self.timed_step(day, 'navigate'):
+                if not self.select_only_day(day):
+                    return False
                 
-        self.controller.pdf_manager.merge_work_pdfs()
-        self.controller.pdf_manager.merge_answer_pdfs()
-        self.controller.pdf_manager.cleanup_folders()
+                # 이미 이 Day를 불러왔으면 (설정도 그대로면) 다시 불러오지 않는다
+                loading = self.session['loaded_day'] != day
+                if loading:
+                    if not self.click_position('buttons.load_day'):
+                        sessions.forget(self.session, 'loaded_day')
+                        return False
+                    sessions.update(self.session, loaded_day=day)
+            
+            # 불러오는 동안에는 다른 워커가 포커스를 쓸 수 있다
+            if loading:
+                with self.timed_step(day, 'load'):
+                    self.backend.sleep(Config.get_delay('load_day'))  # Day 불러오기 딜레이 (tune으로 보정)
             
+            # 재출력이면 검사에 실패한 이전 파일을 먼저 지운다 (남아 있으면 크기가 그대로인 옛 파일을
+            # 출력 완료로 보고 다시 검사하게 되고, FactoryVoca가 덮어쓰기 확인 창을 띄운다)
+            work_file = os.path.join(self.get_work_folder(), f"{self.get_filename(day)}.pdf")
+            if os.path.exists(work_file):
+                try:
+                    os.unlink(work_file)
+                except OSError as e:
+                    self.log(f"이전 출력 파일을 지울 수 없습니다: {work_file} - {str(e)}")
+                    return False
+            
+            with self.timed_step(day, 'print'):
+                if not self.print_wordbook():
+                    return False
+            
+            # 파일 쓰기 확인과 검사는 다음 Day를 진행하는 동안 백그라운드에서
+            self.work_files[day] = work_file
+            self.export_futures.append(self.export_waiter.submit(self.confirm_export, day, work_file))
+        return True
+            
+    def prepare_session(self):
+        """이 창의 상태를 확인하고 factoryvoca_options와 다른 설정만 바꾸기"""
+        sessions = self.controller.sessions
+        with self.focus_lock:
+            window = self.window or self.find_and_activate_window("Factoryvoca")
+            self.session = sessions.session_for(window)
+            sessions.verify(self.session, window, self.backend)
+            # 작업 사이에 FactoryVoca에서 단어장이나 설정을 바꿨을 수 있고 화면에서 확인할 방법이 없으므로
+            # Day 목록과 설정 값은 작업마다 다시 맞춘다
+            sessions.forget(self.session, 'loaded_day', 'selected_days', 'word_count', 'eng_to_kor', 'output_path')
+            
+            options = Config.get_value('factoryvoca_options') or {}
+            for field in SessionTracker.CHECKBOXES:
+                if self.session[field] is None:
+                    self.log(f"{field} 상태를 알 수 없어 바꾸지 않습니다 (state_probes에 위치와 색을 설정하세요)")
+            changes = sessions.plan(self.session, options)
+            actions = {
+                'show_first_letter': lambda value: self.toggle_first_letter(),
+                'word_count': self.set_word_count,
+                'eng_to_kor': self.set_eng_to_kor
+            }
+            for field, value in changes:
+                if field not in actions:
+                    self.log(f"factoryvoca_options에서 지원하지 않는 항목: {field}")
+                    continue
+                if not actions[field](value):
+                    sessions.forget(self.session, field)
+                    return False
+                sessions.update(self.session, **{field: value})
+            if changes:
+                self.log("FactoryVoca 설정 변경: " + ", ".join(f"{field}={value}" for field, value in changes))
+        return True
+
+    def select_only_day(self, day):
+        """선택 목록을 [day]로 맞추기 (이미 그렇다면 조작하지 않음)"""
+        sessions = self.controller.sessions
+        if self.session['selected_days'] == [day]:
+            return True
+        if self.session['selected_days'] != []:
+            self.click_selected_day()
+            self.remove_selected_day()
+        sessions.update(self.session, selected_days=[], loaded_day=None)
+        
+        # 단어 선택
+        if not self.select_day(day):
+            return False
+        
+        if not self.add_selected_day():
+            sessions.forget(self.session, 'selected_days')
+            return False
+        sessions.update(self.session, selected_days=[day])
+        return True
+
     def stop_macro(self, e = None):
         """매크로 중단 (에러 등)"""
         self.log("매크로 중단")
         if e:
             self.log("원인: " + str(e))
-        self.controller.view.on_stop_click()
-        pass
+        if self.controller.view:
+            self.controller.ui.post(self.controller.view.on_stop_click)
     
     def find_and_activate_window(self, title: str, title_key: str = "window_title"):
         """정확한 창 제목으로 창을 찾아서 활성화"""
         try:
             start_time = time.time()
-            windows = pyautogui.getWindowsWithTitle(title)
+            
+            # 병렬 실행 중이면 제목 대신 배정된 창(핸들)을 그대로 사용
+            if self.window is not None and title_key == "window_title":
+                self.backend.activate(self.window)
+                self.backend.sleep(0.1)  # 활성화 대기
+                return self.window
+            
+            windows = self.backend.get_windows_with_title(title)
             
             for window in windows:
                 if window.title == Config.get_value(title_key):
-                    window.activate()
+                    self.backend.activate(window)
                     end_time = time.time()
                     self.debug_log(f"{window.title} 창 찾기 소요 시간: {end_time - start_time}초")
-                    pyautogui.sleep(0.1)  # 활성화 대기
+                    self.backend.sleep(0.1)  # 활성화 대기
                     return window
         except Exception as e:
-            messagebox.showerror("오류", f"창을 찾는 중 오류가 발생했습니다: {str(e)}")
+            self.controller.show_error("오류", f"창을 찾는 중 오류가 발생했습니다: {str(e)}")
             return None
 
         
     def click_position(self, position_key, title = "Factoryvoca", title_key = "window_title"):
-        """설정된 위치 클릭"""
+        """설정된 위치 클릭 (action_modes에서 키보드로 지정한 동작은 키 입력으로 대신함)"""
+        # 키 순서가 설정되지 않은 동작은 그대로 클릭
+        if Config.get_action_mode(position_key) == 'keyboard' and Config.get_key_sequence(position_key):
+            if self.send_keys(position_key, title, title_key):
+                return True
+            self.log(f"키보드 입력을 할 수 없어 클릭으로 대신합니다: {position_key}")
         try:
-            # 창 찾고 활성화
-            window = self.find_and_activate_window(title, title_key)
-            if not window:
-                return False
-                
-            # position_key에 해당하는 좌표 찾기 (예: 'buttons.add_day')
-            coords = self.get_position_from_config(position_key)
-            if not coords:
-                self.log(f"좌표를 찾을 수 없습니다: {position_key}")
-                return False
+            with self.focus_lock:
+                # 창 찾고 활성화
+                window = self.find_and_activate_window(title, title_key)
+                if not window:
+                    return False
+                    
+                # position_key에 해당하는 좌표 찾기 (예: 'buttons.add_day')
+                coords = self.get_position_from_config(position_key)
+                if not coords:
+                    self.log(f"좌표를 찾을 수 없습니다: {position_key}")
+                    return False
+                    
+                # 상대 좌표를 절대 좌표로 변환
+                abs_x = window.left + coords[0]
+                abs_y = window.top + coords[1]
                 
-            # 상대 좌표를 절대 좌표로 변환
-            abs_x = window.left + coords[0]
-            abs_y = window.top + coords[1]
-            
-            # 클릭
-            pyautogui.click(abs_x, abs_y)
-            pyautogui.sleep(Config.get_delay('click'))  # 약간의 딜레이
-            return True
+                # 클릭
+                self.backend.click(abs_x, abs_y)
+                self.backend.sleep(Config.get_delay('click'))  # 약간의 딜레이
+                return True
             
         except Exception as e:
             self.log(f"클릭 중 오류 발생: {str(e)}")
             return False
 
-    def get_position_from_config(self, position_key):
-        """config에서 위치 정보 가져오기"""
+    def send_keys(self, position_key, title = "Factoryvoca", title_key = "window_title"):
+        """keyboard_actions에 설정된 키 순서를 한 번에 입력 (설정이 없거나 창이 없으면 False)"""
+        steps = Config.get_key_sequence(position_key)
+        if not steps:
+            return False
         try:
-            # 키를 점(.)으로 분리하여 딕셔너리 탐색
-            keys = position_key.split('.')
-            value = Config._config['ui_positions']
-            for key in keys:
-                value = value[key]
-            return value
-        except (KeyError, TypeError):
-            return None
+            with self.focus_lock:
+                window = self.find_and_activate_window(title, title_key)
+                if not window:
+                    return False
+                # 키 사이에는 기다리지 않고, 마지막에 한 번만 대기
+                for keys in steps:
+                    if len(keys) > 1:
+                        self.backend.hotkey(*keys)
+                    else:
+                        self.backend.press(keys[0])
+                self.backend.sleep(Config.get_delay('keyboard'))
+                return True
+        except Exception as e:
+            self.log(f"키 입력 중 오류 발생: {str(e)}")
+            return False
+
+    def get_position_from_config(self, position_key):
+        """config에서 위치 정보 가져오기 (미리 평탄화된 좌표표에서 조회)"""
+        return Config.get_position(position_key)
 
     def select_day(self, day_number: int):
         """특정 Day 선택 (PageDown 및 PageUp 활용)"""
@@ -949,8 +4398,8 @@ class MacroController:
                 return False
                 
             # Home 키로 맨 위로 이동
-            pyautogui.press('home')
-            pyautogui.sleep(0.1)
+            self.backend.press('home')
+            self.backend.sleep(0.1)
             
             # PageDown 한 번에 이동하는 Day 수
             page_size = Config.get_value('page_down_size')  # 예: 16
@@ -967,24 +4416,24 @@ class MacroController:
             if current_position > mid_point:
                 # Page Down을 사용하여 다음 페이지로 이동
                 for _ in range(total_pages + 1):
-                    pyautogui.press('pagedown')
-                    pyautogui.sleep(pyautogui.sleep(Config.get_delay('page_down')))
+                    self.backend.press('pagedown')
+                    self.backend.sleep(Config.get_delay('page_down'))
                 
                 # 남은 Day는 위 화살표로 이동
                 remaining_days = page_size - current_position
                 for _ in range(remaining_days):
-                    pyautogui.press('up')
-                    pyautogui.sleep(Config.get_delay('arrow_key'))
+                    self.backend.press('up')
+                    self.backend.sleep(Config.get_delay('arrow_key'))
             else:
                 # Page Down을 사용하여 대략적인 위치로 이동
                 for _ in range(total_pages):
-                    pyautogui.press('pagedown')
-                    pyautogui.sleep(pyautogui.sleep(Config.get_delay('page_down')))
+                    self.backend.press('pagedown')
+                    self.backend.sleep(Config.get_delay('page_down'))
                 
                 # 남은 Day는 아래 화살표로 이동
                 for _ in range(current_position):
-                    pyautogui.press('down')
-                    pyautogui.sleep(Config.get_delay('arrow_key'))
+                    self.backend.press('down')
+                    self.backend.sleep(Config.get_delay('arrow_key'))
 
             return True
             
@@ -998,8 +4447,7 @@ class MacroController:
             if not self.click_position('inputs.word_count'):
                 return False
             
-            pyautogui.write(str(count))
-            return True
+            return self.text_entry.enter(str(count))
             
         except Exception as e:
             self.log(f"단어 수 설정 중 오류 발생: {str(e)}")
@@ -1011,8 +4459,7 @@ class MacroController:
             if not self.click_position('inputs.eng_to_kor'):
                 return False
             
-            pyautogui.write(str(value))
-            return True
+            return self.text_entry.enter(str(value))
             
         except Exception as e:
             self.log(f"영한 비율 설정 중 오류 발생: {str(e)}")
@@ -1020,9 +4467,11 @@ class MacroController:
         
     def toggle_auto_answer_save(self):
         """자동 저장 토글"""
-        self.auto_answer_save = not self.auto_answer_save
         self.debug_log("자동 저장 토글")
-        return self.click_position('checkboxes.auto_answer_save')
+        if not self.click_position('checkboxes.auto_answer_save'):
+            return False
+        self.controller.sessions.update(self.session, auto_answer_save=not self.session['auto_answer_save'])
+        return True
 
     def toggle_first_letter(self):
         """첫글자 보여주기 토글"""
@@ -1040,7 +4489,7 @@ class MacroController:
         """Day 불러오기"""
         if not self.click_position('buttons.load_day'):
             return False
-        pyautogui.sleep(Config.get_delay('load_day'))  # Day 불러오기 딜레이
+        self.backend.sleep(Config.get_delay('load_day'))  # Day 불러오기 딜레이
         return True
 
     def apply_settings(self):
@@ -1056,44 +4505,109 @@ class MacroController:
         return self.click_position('selected_day.position')
 
     def print_wordbook(self):
-        """단어장 출력"""
-        if not self.auto_answer_save:
-            self.toggle_auto_answer_save()
-        
-        start_window_count = len(pyautogui.getAllWindows())
-        self.debug_log(f"출력 전 창 개수: {start_window_count}")
-        
-        if not self.click_position('buttons.print'): # 출력 버튼 누르기
-            return False
-        self.log("출력 버튼 클릭")
-        
-        
-        pyautogui.sleep(Config.get_delay('print_btn'))  # 단어장 출력버튼 딜레이
-        
-        if not self.print_output_path_set:
-            self.set_print_output_path()
-        
-        self.debug_log(f"출력 버튼 누른 후 창 개수: {len(pyautogui.getAllWindows())}")
-            # 파일이름 입력
-        pyperclip.copy(self.get_filename(self.current_day))
-        pyautogui.hotkey('ctrl', 'v')  # 파일이름 입력
-        self.log(f"파일이름 입력: {self.get_filename()}")
+        """단어장 출력 (1단계)
 
+        파일이름을 넘기고 출력 대화상자가 닫히면 바로 돌아온다. 파일이 다 써졌는지는
+        confirm_export가 백그라운드에서 확인하며, 동시에 진행 중인 출력 수는
+        max_inflight_exports로 제한한다.
+        """
+        # 진행 중인 출력이 너무 많으면 하나가 끝날 때까지 대기 (역압)
+        self.export_slots.acquire()
+        printed = False
+        try:
+            printed = self._print_wordbook()
+        finally:
+            if not printed:
+                self.export_slots.release()
+        return printed
 
-        pyautogui.sleep(Config.get_delay('input_filename'))  # 파일이름 입력 딜레이
-        pyautogui.press('enter')  # 엔터로 출력 시작
-        
-    
-        pyautogui.sleep(Config.get_delay('print_duration'))  # 단어장 출력 완료까지 딜레이
-        
+    def _print_wordbook(self):
+        with self.focus_lock:
+            if self.session['auto_answer_save'] is False:
+                self.toggle_auto_answer_save()
+            
+            start_window_count = len(self.backend.get_all_windows())
+            self.debug_log(f"출력 전 창 개수: {start_window_count}")
+            
+            if not self.click_position('buttons.print'): # 출력 버튼 누르기
+                return False
+            self.log("출력 버튼 클릭")
+            
+            
+            self.backend.sleep(Config.get_delay('print_btn'))  # 단어장 출력버튼 딜레이
+            
+            if self.session['output_path'] != os.path.abspath(self.get_work_folder()):
+                self.set_print_output_path()
+            
+            self.debug_log(f"출력 버튼 누른 후 창 개수: {len(self.backend.get_all_windows())}")
+                # 파일이름 입력
+            if not self.text_entry.enter(self.get_filename(self.current_day)):  # 파일이름 입력
+                return False
+            self.log(f"파일이름 입력: {self.get_filename()}")
+
+
+            self.backend.sleep(Config.get_delay('input_filename'))  # 파일이름 입력 딜레이
+            self.printing_day = self.current_day
+            self.printing_since = time.time()
+            bind_count = self.answer_watcher.bind_count(self.current_day)
+            self.backend.press('enter')  # 엔터로 출력 시작
+            
+            # 다음 Day나 다른 창의 대화상자, 답지와 섞이지 않도록
+            # 이 대화상자가 닫히고 답지가 이 Day에 묶일 때까지만 포커스 유지
+            if not self.wait_for_dialog_close():
+                self.log("출력 대화상자가 닫히지 않았습니다.")
+                return False
+            if self.session['auto_answer_save'] and not self.answer_watcher.wait_for_binding(self.current_day, bind_count):
+                # 공용 정답 폴더에서 다른 작업의 답지를 대신 쓰지 않도록 이 Day를 다시 출력
+                self.request_reprint(self.current_day, "답지를 찾지 못함")
+        return True
+
+    def wait_for_dialog_close(self, interval=0.1):
+        """출력 대화상자가 닫힐 때까지 대기 (config의 dialog_timeout초, 기본값 60초가 지나면 False)
+
+        포커스 잠금을 쥔 채 기다리므로 확인 창 등으로 대화상자가 닫히지 않아도 다른 워커가
+        영원히 멈추지 않게 한다.
+        """
+        print_title = Config.get_value('print_title')
+        deadline = time.time() + Config.get_value('dialog_timeout', 60)
         while True:
-            self.debug_log(f"현재 창 개수: {len(pyautogui.getAllWindows())}")
-            if len(pyautogui.getAllWindows()) <= start_window_count:
-                break
-            pyautogui.sleep(0.5)
-            time.sleep(0.5)
-        # 단어장 출력 딜레이
+            dialogs = [w for w in self.backend.get_windows_with_title(print_title) if w.title == print_title]
+            self.debug_log(f"현재 창 개수: {len(self.backend.get_all_windows())}")
+            if not dialogs:
+                return True
+            if time.time() > deadline:
+                return False
+            self.backend.sleep(interval)
+
+    def confirm_export(self, day, work_file):
+        """출력 2단계: 파일이 다 써질 때까지 기다린 뒤 검사에 넘기기 (백그라운드 스레드)"""
+        try:
+            self.backend.sleep(Config.get_delay('print_duration'))  # 단어장 출력 완료까지 최소 딜레이
+            if not self.wait_for_export(work_file):
+                self.request_reprint(day, "출력 파일 대기 시간 초과")
+                return False
+        finally:
+            self.export_slots.release()
+        self.debug_log(f"Day {day} 출력 완료: {work_file}")
+        self.pdf_validator.submit(day, work_file)
+        self.day_verifier.submit(day, work_file)
         return True
+
+    def wait_for_export(self, pdf_path, timeout=None, interval=0.2):
+        """출력 파일이 생기고 크기가 더 이상 변하지 않을 때까지 대기"""
+        if timeout is None:
+            timeout = Config.get_value('export_timeout', 120)
+        deadline = time.time() + timeout
+        last_size = -1
+        while time.time() < deadline:
+            if os.path.exists(pdf_path):
+                size = os.path.getsize(pdf_path)
+                if size > 0 and size == last_size:
+                    return True
+                last_size = size
+            time.sleep(interval)
+        self.log(f"출력 파일 대기 시간 초과: {pdf_path}")
+        return False
     
     def get_filename(self, day = None):
         """파일이름을 생성"""
@@ -1108,9 +4622,13 @@ class MacroController:
         
         if self.input_values['type'] != WordbookType.ORIGINAL and self.input_values['version']:
             filename += f"ver{self.input_values['version']}"
+        
+        # 직접 출력한 랜덤 순서는 FactoryVoca와 다르므로 같은 이름의 GUI 출력과 섞이지 않게 표시
+        if NativeRenderer.tags_output(self.input_values):
+            filename += f" {NativeRenderer.TAG}"
             
         if day:
-            filename += f" Day {self.current_day}"
+            filename += f" Day {day}"
                 
         return re.sub(r'[\\/:*?"<>|]', '_', filename)
         
@@ -1123,14 +4641,16 @@ class MacroController:
                 return False
             
             # 경로 입력
-            pyautogui.write(os.path.join(os.getcwd(), "work"))
-            pyautogui.sleep(Config.get_delay('output_path'))  # 출력 경로 입력 딜레이
-            pyautogui.press('enter')
+            output_path = os.path.abspath(self.get_work_folder())
+            if not self.text_entry.enter(output_path):
+                return False
+            self.backend.sleep(Config.get_delay('output_path'))  # 출력 경로 입력 딜레이
+            self.backend.press('enter')
             
             if not self.click_position('inputs.input_filename', Config.get_value('print_title'), "print_title"):
                 return False
             
-            self.print_output_path_set = True
+            self.controller.sessions.update(self.session, output_path=output_path)
             return True
             
         except Exception as e:
@@ -1141,7 +4661,22 @@ class Config:
     # 클래스 변수로 설정
     _config = {
         'window_title': "FactoryVoca(http://cafe.naver.com/factoryvoca)",
+        'print_title': "출력",
         'debug': True,
+        'page_down_size': 16,
+        'delays': {
+            'default': 0.5,
+            'click': 0.2,
+            'arrow_key': 0.05,
+            'page_down': 0.1,
+            'load_day': 4.0,
+            'print_btn': 1.0,
+            'input_filename': 0.5,
+            'print_duration': 2.0,
+            'output_path': 0.5,
+            'paste': 0.05,
+            'keyboard': 0.2
+        },
         'ui_positions': {
             'day_list': {
                 'first_day': [50, 150]
@@ -1155,76 +4690,651 @@ class Config:
                 'load_day': [450, 260],
                 'apply': [800, 300],
                 'random_apply': [800, 330],
-                'print': [800, 360]
+                'print': [800, 360],
+                'set_output_path': [400, 60]
             },
             'inputs': {
                 'word_count': [700, 150],
-                'eng_to_kor': [700, 200]
+                'eng_to_kor': [700, 200],
+                'input_filename': [200, 100]
             },
             'checkboxes': {
-                'show_first_letter': [700, 250]
+                'show_first_letter': [700, 250],
+                'auto_answer_save': [700, 280]
             }
         }
     }
 
+    # config.json이 없을 때 쓰는 기본 설정
+    _defaults = _config
+
+    # 스키마: 키 -> 허용되는 타입 (window_title, ui_positions는 필수)
+    SCHEMA = {
+        'window_title': str,
+        'print_title': str,
+        'debug': bool,
+        'page_down_size': int,
+        'delays': dict,
+        'ui_positions': dict,
+        'config_version': (str, int),
+        'expected_pages': (int, dict),
+        'max_reprints': int,
+        'day_header_pattern': str,
+        'unit_names': dict,
+        'verify_workers': int,
+        'max_inflight_exports': int,
+        'export_timeout': (int, float),
+        'record_trace': bool,
+        'history_db': str,
+        'staging': dict,
+        'verify_paste': bool,
+        'merge_outputs': dict,
+        'optimize_output': bool,
+        'shared_output': str,
+        'preflight_probes': dict,
+        'preflight_printer_pattern': str,
+        'keyboard_actions': dict,
+        'action_modes': dict,
+        'metrics_port': int,
+        'metrics_host': str,
+        'dialog_timeout': (int, float),
+        'delay_profile': str,
+        'engine': str,
+        'native_renderer': dict,
+        'factoryvoca_options': dict,
+        'state_probes': dict,
+        'session_state_file': str
+    }
+    REQUIRED = ('window_title', 'ui_positions')
+
+    _path = 'config.json'
+    _snapshot = None
+
     @classmethod
     def load(cls):
         """config.json 파일에서 설정 로드"""
-        config_path = 'config.json'
+        config_path = cls._path
         try:
             if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    cls._config = json.load(f)
+                cls._load_file()
             else:
                 with open(config_path, 'w', encoding='utf-8') as f:
                     json.dump(cls._config, f, indent=4, ensure_ascii=False)
+                cls._snapshot = ConfigSnapshot(cls._config, os.path.getmtime(config_path))
         except Exception as e:
             print(f"설정 로드 오류: {str(e)}")
+        for warning in cls._snapshot.warnings:
+            print(warning)
+
+    @classmethod
+    def _load_file(cls):
+        """config.json을 읽고 검증해서 새 스냅샷으로 교체 (검증 실패 시 ConfigError)"""
+        mtime = os.path.getmtime(cls._path)
+        with open(cls._path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+        snapshot = ConfigSnapshot(raw, mtime)
+        # 스냅샷을 통째로 바꾸므로 다른 스레드는 이전 설정 또는 새 설정 중 하나만 본다
+        cls._config = raw
+        cls._snapshot = snapshot
+
+    @classmethod
+    @contextmanager
+    def override(cls, values):
+        """블록 안에서만 설정 일부를 바꾼 스냅샷 사용 ('delays'는 기존 값에 덮어씀)"""
+        previous_config, previous_snapshot = cls._config, cls._snapshot
+        raw = {**previous_config, **values}
+        if 'delays' in values:
+            raw['delays'] = {**(previous_config.get('delays') or {}), **values['delays']}
+        cls._config = raw
+        cls._snapshot = ConfigSnapshot(raw, previous_snapshot.mtime)
+        try:
+            yield
+        finally:
+            cls._config, cls._snapshot = previous_config, previous_snapshot
+
+    @classmethod
+    def get_delay_profile_path(cls, raw=None):
+        """이 PC의 딜레이 프로파일 경로 (delay_profile이 빈 문자열이면 사용 안 함)"""
+        path = (raw if raw is not None else cls._snapshot.raw).get('delay_profile')
+        if path is None:
+            path = os.path.join("delay_profiles", f"{platform.node()}.json")
+        return path or None
+
+    @classmethod
+    def reload_if_changed(cls, log=print):
+        """config.json이 바뀌었으면 다시 로드 (매크로의 Day 경계에서 호출). 다시 로드했으면 True
+
+        새 파일이 검증에 실패하면 이전 설정을 그대로 사용하고 오류는 log(보통 controller.log)로 알린다.
+        """
+        try:
+            mtime = os.path.getmtime(cls._path)
+        except OSError:
+            return False
+        if cls._snapshot is None or mtime == cls._snapshot.mtime:
+            return False
+        try:
+            cls._load_file()
+        except Exception as e:
+            log(f"설정 다시 로드 오류 (이전 설정 유지): {str(e)}")
+            # 같은 파일로 계속 실패하지 않도록 시각만 기록
+            cls._snapshot.mtime = mtime
+            return False
+        for warning in cls._snapshot.warnings:
+            log(warning)
+        return True
+
+    @classmethod
+    def validate(cls, raw):
+        """스키마 검사 후 오류 메시지 목록 반환"""
+        errors = []
+        if not isinstance(raw, dict):
+            return ["최상위 값이 객체가 아닙니다"]
+        for key in cls.REQUIRED:
+            if key not in raw:
+                errors.append(f"'{key}' 항목이 없습니다")
+        for key, expected in cls.SCHEMA.items():
+            if key not in raw or raw[key] is None:
+                continue
+            value = raw[key]
+            # bool은 int의 하위 타입이므로 숫자 항목에서는 따로 거른다
+            if not isinstance(value, expected) or (expected is not bool and isinstance(value, bool)):
+                errors.append(f"'{key}' 형식이 올바르지 않습니다: {value!r}")
+
+        for key, value in (raw.get('delays') or {}).items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                errors.append(f"'delays.{key}'는 0 이상의 숫자여야 합니다: {value!r}")
+        if isinstance(raw.get('page_down_size'), int) and raw['page_down_size'] <= 0:
+            errors.append("'page_down_size'는 1 이상이어야 합니다")
+        # 0이면 기본값이 아니라 그 값 그대로 쓰이므로 범위를 확인한다
+        for key, minimum in (('max_reprints', 0), ('verify_workers', 1), ('max_inflight_exports', 1)):
+            value = raw.get(key)
+            if isinstance(value, int) and not isinstance(value, bool) and value < minimum:
+                errors.append(f"'{key}'는 {minimum} 이상이어야 합니다: {value!r}")
+        for key in ('export_timeout', 'dialog_timeout'):
+            value = raw.get(key)
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and value <= 0:
+                errors.append(f"'{key}'는 0보다 커야 합니다: {value!r}")
+        merge_outputs = raw.get('merge_outputs')
+        if isinstance(merge_outputs, dict):
+            packet_size = merge_outputs.get('weekly_packet_size')
+            if packet_size is not None and (isinstance(packet_size, bool) or not isinstance(packet_size, int) or packet_size < 1):
+                errors.append(f"'merge_outputs.weekly_packet_size'는 1 이상의 정수여야 합니다: {packet_size!r}")
+            editions = merge_outputs.get('editions', [])
+            if not isinstance(editions, list):
+                errors.append(f"'merge_outputs.editions'는 배열이어야 합니다: {editions!r}")
+                editions = []
+            for index, edition in enumerate(editions):
+                if not (isinstance(edition, dict) and isinstance(edition.get('name'), str) and edition['name'].strip()):
+                    errors.append(f"'merge_outputs.editions[{index}]'에 이름(name)이 없습니다: {edition!r}")
+                    continue
+                try:
+                    if not parse_day_ranges(edition.get('days', '')):
+                        raise ValueError
+                except ValueError:
+                    errors.append(f"'merge_outputs.editions[{index}].days'가 Day 범위(예: \"1-10,12\")가 아닙니다: "
+                                  f"{edition.get('days')!r}")
+        workers = (raw.get('native_renderer') or {}).get('workers') if isinstance(raw.get('native_renderer'), dict) else None
+        if workers is not None and (isinstance(workers, bool) or not isinstance(workers, int) or workers < 1):
+            errors.append(f"'native_renderer.workers'는 1 이상의 정수여야 합니다: {workers!r}")
+
+        def check_positions(data, prefix):
+            for key, value in data.items():
+                if isinstance(value, dict):
+                    check_positions(value, f"{prefix}{key}.")
+                elif not (isinstance(value, list) and len(value) == 2
+                          and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value)):
+                    errors.append(f"'{prefix}{key}' 좌표는 [x, y] 숫자 배열이어야 합니다: {value!r}")
+        if isinstance(raw.get('ui_positions'), dict):
+            check_positions(raw['ui_positions'], '')
+
+        for key, value in (raw.get('keyboard_actions') or {}).items():
+            steps = [value] if isinstance(value, str) else value
+            if not (isinstance(steps, list) and steps and all(isinstance(step, str) and step for step in steps)):
+                errors.append(f"'keyboard_actions.{key}'는 키 문자열 또는 그 배열이어야 합니다: {value!r}")
+                continue
+            for step in steps:
+                try:
+                    keys, _ = cls.parse_key_step(step)
+                except ValueError as e:
+                    errors.append(f"'keyboard_actions.{key}': {e}")
+                    continue
+                # pyautogui가 없는 환경(가상 창만 사용)에서는 키 이름은 검사하지 않는다
+                unknown = [k for k in keys if pyautogui is not None
+                           and (k.lower() if len(k) > 1 else k) not in pyautogui.KEYBOARD_KEYS]
+                if unknown:
+                    errors.append(f"'keyboard_actions.{key}'에 알 수 없는 키가 있습니다: {', '.join(unknown)}")
+        for key, value in (raw.get('action_modes') or {}).items():
+            if value not in ('click', 'keyboard'):
+                errors.append(f"'action_modes.{key}'는 'click' 또는 'keyboard'여야 합니다: {value!r}")
+        if raw.get('engine', 'gui') not in ('gui', 'native'):
+            errors.append(f"'engine'은 'gui' 또는 'native'여야 합니다: {raw['engine']!r}")
+        elif raw.get('engine') == 'native' and not (raw.get('native_renderer') or {}).get('source'):
+            errors.append("'engine'이 'native'이면 'native_renderer.source'(단어장 자료 파일)가 필요합니다")
+        return errors
 
     @classmethod
-    def get_value(cls, key):
-        """key에 해당하는 값 반환"""
-        return cls._config.get(key)
+    def get_value(cls, key, default=None):
+        """key에 해당하는 값 반환 (없거나 null이면 default, 0이나 빈 값은 그대로)"""
+        value = cls._snapshot.raw.get(key)
+        return default if value is None else value
     
     @classmethod
     def get_delay(cls, key):
         """key에 해당하는 딜레이 값을 반환"""
-        return cls._config['delays'].get(key, cls._config['delays']['default'])
+        snapshot = cls._snapshot
+        return snapshot.delays.get(key, snapshot.default_delay)
+
+    @classmethod
+    def get_action_mode(cls, position_key):
+        """동작을 클릭과 키보드 중 무엇으로 할지 ('action_modes'에 없으면 'default', 그것도 없으면 클릭)"""
+        modes = cls._snapshot.raw.get('action_modes') or {}
+        return modes.get(position_key, modes.get('default', 'click'))
+
+    @classmethod
+    def get_key_sequence(cls, position_key):
+        """keyboard_actions의 키 순서를 [(키, ...), ...]로 변환 ('alt+l'은 동시 입력, 'tab*3'은 반복)"""
+        value = (cls._snapshot.raw.get('keyboard_actions') or {}).get(position_key)
+        if not value:
+            return []
+        steps = []
+        for step in ([value] if isinstance(value, str) else value):
+            keys, repeat = cls.parse_key_step(step)
+            steps.extend([keys] * repeat)
+        return steps
+
+    @staticmethod
+    def parse_key_step(step):
+        """'alt+l', 'tab*3' 같은 키 하나를 ((키, ...), 반복 횟수)로 (형식이 틀리면 ValueError)"""
+        step, star, repeat = step.partition('*')
+        if star and not (repeat.isdigit() and int(repeat) >= 1):
+            raise ValueError(f"반복 횟수는 1 이상의 정수여야 합니다 (키*횟수): {step}*{repeat}")
+        keys = tuple(step.split('+')) if step != '+' else ('+',)
+        if not all(keys):
+            raise ValueError(f"빈 키 이름이 있습니다: {step!r}")
+        return keys, int(repeat) if star else 1
+
+    @classmethod
+    def get_version(cls):
+        """설정 버전 ('config_version' 값, 없으면 설정 내용의 해시)"""
+        return cls._snapshot.version
+
+    @classmethod
+    def get_expected_pages(cls, day):
+        """Day의 예상 페이지 수 반환 (숫자 또는 {"Day": 페이지 수} 형식, 없으면 None)"""
+        expected = cls._snapshot.raw.get('expected_pages')
+        if isinstance(expected, dict):
+            return expected.get(str(day), expected.get('default'))
+        return expected
 
     @classmethod
     def get_position(cls, position_key):
         """position_key에 해당하는 좌표 반환"""
-        try:
-            keys = position_key.split('.')
-            value = cls._config['ui_positions']
-            for key in keys:
-                value = value[key]
-            return value
-        except (KeyError, TypeError):
-            return None
+        return cls._snapshot.positions.get(position_key)
 
     @classmethod
     def get_all_positions(cls):
         """모든 위치 정보 반환"""
-        positions = []
-        
-        def collect_positions(data, prefix=''):
-            for key, value in data.items():
-                if isinstance(value, dict):
-                    collect_positions(value, f"{prefix}{key}.")
-                elif isinstance(value, list):
-                    positions.append(f"{prefix}{key}")
-        
-        collect_positions(cls._config['ui_positions'])
-        return positions
+        return list(cls._snapshot.positions)
 
     @classmethod
     def is_debug_mode(cls) -> bool:
         """디버그 모드 여부 반환"""
-        return cls._config.get('debug', False)
+        return cls._snapshot.raw.get('debug', False)
+
+class ConfigError(ValueError):
+    """config.json 검증 오류"""
+
+class ConfigSnapshot:
+    """검증을 마친 설정의 읽기 전용 스냅샷
+
+    좌표는 'buttons.add_day' 같은 평탄한 키의 표로, 딜레이는 기본값을 채워서 미리 계산해 둔다.
+    딜레이 프로파일을 읽을 수 없으면 프로파일 없이 만들고 사유를 warnings에 남긴다.
+    """
+    DEFAULT_DELAY = 0.5
+
+    def __init__(self, raw, mtime=None):
+        errors = Config.validate(raw)
+        if errors:
+            raise ConfigError("설정 검증 실패:\n" + "\n".join(f"- {error}" for error in errors))
+
+        self.raw = MappingProxyType(raw)
+        self.mtime = mtime
+        self.warnings = []
+
+        positions = {}
+        def flatten(data, prefix=''):
+            for key, value in data.items():
+                if isinstance(value, dict):
+                    flatten(value, f"{prefix}{key}.")
+                else:
+                    positions[f"{prefix}{key}"] = tuple(value)
+        flatten(raw['ui_positions'])
+        self.positions = MappingProxyType(positions)
+
+        # 기본 딜레이 위에 config.json의 딜레이, 그 위에 이 PC의 딜레이 프로파일(tune 결과)을 덮어쓴다.
+        # config.json에 delays.default가 있으면 빠진 항목은 내장 기본값이 아니라 그 값을 쓴다
+        user_delays = raw.get('delays') or {}
+        delays = {} if 'default' in user_delays else dict(Config._defaults['delays'])
+        delays.update(user_delays)
+        profile_path = Config.get_delay_profile_path(raw)
+        if profile_path and os.path.exists(profile_path):
+            profile_delays, error = self.read_delay_profile(profile_path)
+            if error:
+                self.warnings.append(f"딜레이 프로파일을 사용하지 않습니다 ({profile_path}): {error}")
+            else:
+                delays.update(profile_delays)
+        self.default_delay = delays.pop('default', self.DEFAULT_DELAY)
+        self.delays = MappingProxyType(delays)
+
+        if raw.get('config_version'):
+            self.version = str(raw['config_version'])
+        else:
+            content = json.dumps(raw, sort_keys=True, ensure_ascii=False)
+            self.version = hashlib.sha1(content.encode('utf-8')).hexdigest()[:8]
+
+    @staticmethod
+    def read_delay_profile(path):
+        """tune이 저장한 프로파일의 딜레이 -> (딜레이 dict, None) 또는 (None, 오류 메시지)"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            return None, str(e)
+        delays = data.get('delays') if isinstance(data, dict) else None
+        if not isinstance(delays, dict):
+            return None, "'delays' 항목이 없습니다"
+        invalid = [key for key, value in delays.items()
+                   if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0]
+        if invalid:
+            return None, "0 이상의 숫자가 아닌 딜레이: " + ", ".join(invalid)
+        return delays, None
+
+# 기본 설정으로 첫 스냅샷 생성 (Config.load 전에도 조회 가능)
+Config._snapshot = ConfigSnapshot(Config._config)
+
+def add_job_arguments(parser):
+    """단어장 작업 입력값(AppUI의 입력 필드와 같은 항목) 인자 추가"""
+    parser.add_argument("--name", required=True, help="단어장 이름")
+    parser.add_argument("--type", default=WordbookType.ORIGINAL.value, choices=WordbookType.get_values(),
+                        help="출제 유형")
+    parser.add_argument("--version", default=None, help="버전 (원래순서가 아닐 때)")
+    parser.add_argument("--day-start", type=int, required=True)
+    parser.add_argument("--day-end", type=int, required=True)
+
+def job_values_from_args(args):
+    """명령행 인자를 AppUI.get_input_values()와 같은 형식으로 변환"""
+    wordbook_type = WordbookType.from_string(args.type)
+    return {
+        'name': args.name,
+        'type': wordbook_type,
+        'version': args.version if wordbook_type != WordbookType.ORIGINAL else None,
+        'day_start': str(args.day_start),
+        'day_end': str(args.day_end)
+    }
+
+def create_headless_controller(simulate=0, speed=1.0, trace=None, latency=0.0, day_count=200, root=None):
+    """UI 없는 컨트롤러 생성 (simulate > 0이면 가상 FactoryVoca 창, trace가 있으면 호출 기록)
+
+    root를 주면 GUI와 같은 창(AppUI)을 만들지만 FactoryVoca 조작은 주어진 백엔드로 한다.
+    """
+    simulated = (SimulatedBackend(instances=simulate, speed=speed, latency=latency, day_count=day_count)
+                 if simulate else None)
+    backend = simulated or PyAutoGuiBackend()
+    if trace:
+        backend = RecordingBackend(backend, trace)
+    controller = Controller(root, backend=backend)
+    if simulated:
+        simulated.answer_folder = controller.directories["Answer"]
+    return controller
+
+def run_shard_command(args):
+    """여러 FactoryVoca 창에서 병렬 출력"""
+    controller = create_headless_controller(args.simulate, args.speed, args.trace)
+    runner = ShardedRunner(controller, job_values_from_args(args), args.workers)
+    try:
+        return 0 if runner.run() else 1
+    finally:
+        if args.trace:
+            controller.backend.close()
+
+def run_replay_command(args):
+    """기록된 트레이스를 가상 또는 실제 백엔드에서 재현"""
+    backend = SimulatedBackend(instances=args.simulate, speed=args.speed or 1.0) if args.simulate else PyAutoGuiBackend()
+    replayer = TraceReplayer(backend, args.trace, speed=args.speed)
+    summary = replayer.replay()
+    if args.simulate:
+        backend.wait_exports()
+    print(f"이벤트 {summary['events']}개 중 {summary['executed']}개 실행, 불일치 {summary['mismatches']}개")
+    print(f"기록 {summary['recorded_seconds']}초 -> 재현 {summary['replay_seconds']}초")
+    return 0 if summary['mismatches'] == 0 else 1
+
+def run_history_command(args):
+    """PC/설정 버전별 소요 시간 보고서 출력"""
+    history = RunHistory(args.db or Config.get_value('history_db') or "history.sqlite3")
+    rows = history.report()
+    if not rows:
+        print("기록이 없습니다.")
+        return 0
+    print(f"{'PC':<16} {'설정':<10} {'유형':<8} {'단계':<10} {'작업':>4} {'횟수':>6} {'평균(초)':>9} {'최소':>7} {'최대':>7}")
+    for machine, config_version, wordbook_type, step, jobs, count, average, minimum, maximum in rows:
+        print(f"{machine:<16} {config_version:<10} {wordbook_type:<8} {step:<10} {jobs:>4} {count:>6}"
+              f" {average:>9.2f} {minimum:>7.2f} {maximum:>7.2f}")
+    return 0
+
+def run_coordinator_command(args):
+    """작업 대기열을 HTTP로 제공"""
+    job_queue = JobQueue(lease_seconds=args.lease_seconds)
+    if args.jobs:
+        with open(args.jobs, 'r', encoding='utf-8') as f:
+            for values in json.load(f):
+                job_queue.add(values)
+    server = CoordinatorServer(job_queue, args.host, args.port)
+    try:
+        server.serve(exit_when_done=args.exit_when_done)
+    except KeyboardInterrupt:
+        pass
+    for job in job_queue.snapshot():
+        print(f"작업 {job['id']} {job['values']['name']}: {job['status']} ({job['worker'] or '-'}) {job['error'] or ''}")
+    return 0 if all(job['status'] == 'done' for job in job_queue.snapshot()) else 1
+
+def run_submit_command(args):
+    """코디네이터에 작업 추가"""
+    client = CoordinatorClient(args.url)
+    job_id = client.post("/jobs", {'values': encode_job_values(job_values_from_args(args))})['job_id']
+    print(f"작업 {job_id} 추가됨")
+    return 0
+
+def run_worker_command(args):
+    """코디네이터에서 작업을 받아 실행"""
+    controller = create_headless_controller(args.simulate, args.speed)
+    shared_output = args.shared_output or Config.get_value('shared_output') or controller.directories["Output"]
+    worker = JobWorker(controller, CoordinatorClient(args.url), shared_output, args.worker_id, args.heartbeat,
+                       args.stall_timeout)
+    processed = worker.run(exit_when_idle=args.exit_when_idle)
+    print(f"작업 {processed}개 처리")
+    return 0
+
+def run_book_command(args):
+    """병합본에서 Day 뽑기/바꾸기"""
+    book = MergedBook(args.book)
+    try:
+        if args.action == "extract":
+            days = parse_day_ranges(args.days)
+            output_path = args.output or f"{os.path.splitext(args.book)[0]} Day {args.days}.pdf"
+            entries = book.extract(days, output_path)
+            print(f"{output_path}: Day {len({entry['day'] for entry in entries})}개, {entries[-1]['last_page']}쪽")
+        else:
+            entries = book.replace_day(args.day, args.pdf, args.kind)
+            print(f"{args.book}: Day {args.day} 교체, 전체 {entries[-1]['last_page']}쪽")
+    except (ValueError, OSError) as e:
+        print(f"오류: {e}")
+        return 1
+    return 0
+
+def run_tune_command(args):
+    """딜레이 자동 보정"""
+    controller = create_headless_controller(args.simulate, args.speed, latency=args.latency)
+    keys = [key.strip() for key in args.delays.split(',')] if args.delays else None
+    tuner = DelayTuner(controller, args.day_start, args.day_end, args.trials, keys, args.steps, args.margin)
+    result = tuner.tune()
+    if result is None:
+        return 1
+    path = tuner.save(result, args.output)
+    print(f"{'딜레이':<16} {'기존':>8} {'보정':>8}")
+    for key, value in result['delays'].items():
+        print(f"{key:<16} {result['baseline_delays'][key]:>8.3f} {value:>8.3f}")
+    print(f"{result['days']} 한 번 출력: {result['baseline_seconds']:.2f}초 -> {result['tuned_seconds']:.2f}초 "
+          f"({result['speedup']}배)")
+    print(f"저장: {path}")
+    return 0
+
+def run_soak_command(args):
+    """긴 실행에서 자원 사용량 추이 측정"""
+    root = tk.Tk() if args.gui else None
+    controller = create_headless_controller(args.simulate, args.speed, latency=args.latency,
+                                            day_count=max(200, args.day_end), root=root)
+    if root and controller.debug_window is None:
+        # 로그 줄 수도 재도록 디버그 모드가 아니어도 디버그 창을 띄운다
+        controller.debug_window = DebugWindow(controller)
+    output = args.output or os.path.join("soak", datetime.now().strftime('%Y%m%d_%H%M%S') + ".csv")
+    monitor = SoakMonitor(controller, args.every, output)
+    controller.macro.day_observer = monitor.on_day
+
+    def run_rounds():
+        try:
+            for round_number in range(1, args.rounds + 1):
+                controller.log(f"soak {round_number}/{args.rounds}회차")
+                completed = controller.macro.start_macro(job_values_from_args(args)) is not None
+                monitor.sample_folders()
+                if not completed:
+                    controller.log("매크로가 중단되어 soak 측정을 마칩니다.")
+                    break
+            if monitor.days % args.every:
+                monitor.sample()
+        finally:
+            monitor.close()
+            if root:
+                controller.ui.post(root.quit)
+
+    if root:
+        # Tk는 메인 스레드에서 돌리고 매크로는 GUI 실행과 같이 작업 스레드에서 실행
+        threading.Thread(target=run_rounds, name="soak", daemon=True).start()
+        root.mainloop()
+        root.destroy()
+    else:
+        run_rounds()
+
+    print(f"{'항목':<28} {'처음':>10} {'끝':>10} {'증가율':>8} {'R²':>6}")
+    flagged = []
+    for column, first, last, growth, r2, suspicious in monitor.trends(args.threshold):
+        print(f"{column:<28} {first:>10.2f} {last:>10.2f} {growth:>7.0%} {r2:>6.2f}{'  <- 꾸준히 증가' if suspicious else ''}")
+        if suspicious:
+            flagged.append(column)
+    print(f"Day {monitor.days}개, 표본 {len(monitor.rows)}개: {output}")
+    return 1 if flagged else 0
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="AutoTestCrafter (인자 없이 실행하면 GUI)")
+    subparsers = parser.add_subparsers(dest="command")
+
+    shard = subparsers.add_parser("shard", help="여러 FactoryVoca 창에 Day 범위를 나눠 병렬 출력")
+    add_job_arguments(shard)
+    shard.add_argument("--workers", type=int, default=None, help="사용할 창 개수 (기본값: 찾은 창 모두)")
+    shard.add_argument("--simulate", type=int, default=0, metavar="N",
+                       help="실제 창 대신 N개의 가상 FactoryVoca 창 사용")
+    shard.add_argument("--speed", type=float, default=1.0, help="가상 창의 시간 압축 배율")
+    shard.add_argument("--trace", default=None, help="매크로의 모든 백엔드 호출을 기록할 파일 (.jsonl 또는 .jsonl.gz)")
+    shard.set_defaults(func=run_shard_command)
+
+    replay = subparsers.add_parser("replay", help="기록된 트레이스를 다시 실행")
+    replay.add_argument("trace", help="트레이스 파일")
+    replay.add_argument("--speed", type=float, default=1.0, help="시간 압축 배율 (0이면 간격 없이 실행)")
+    replay.add_argument("--simulate", type=int, default=0, metavar="N",
+                        help="실제 화면 대신 N개의 가상 FactoryVoca 창에서 재현")
+    replay.set_defaults(func=run_replay_command)
+
+    history = subparsers.add_parser("history", help="PC/설정 버전별 Day 소요 시간 보고서")
+    history.add_argument("--db", default=None, help="기록 파일 (기본값: config의 history_db 또는 history.sqlite3)")
+    history.set_defaults(func=run_history_command)
+
+    coordinator = subparsers.add_parser("coordinator", help="여러 PC에 단어장 작업을 나눠 주는 코디네이터")
+    coordinator.add_argument("--host", default="127.0.0.1",
+                             help="다른 PC의 워커가 접속하려면 0.0.0.0 (기본값: 이 PC에서만)")
+    coordinator.add_argument("--port", type=int, default=8765)
+    coordinator.add_argument("--jobs", default=None, help="처음에 넣을 작업 목록 JSON 파일")
+    coordinator.add_argument("--lease-seconds", type=float, default=60, help="heartbeat가 없을 때 작업을 다시 대기열에 넣기까지의 시간")
+    coordinator.add_argument("--exit-when-done", action="store_true", help="모든 작업이 끝나면 종료")
+    coordinator.set_defaults(func=run_coordinator_command)
+
+    submit = subparsers.add_parser("submit", help="코디네이터에 작업 추가")
+    submit.add_argument("--url", default="http://127.0.0.1:8765")
+    add_job_arguments(submit)
+    submit.set_defaults(func=run_submit_command)
+
+    worker = subparsers.add_parser("worker", help="코디네이터에서 작업을 받아 실행하는 워커")
+    worker.add_argument("--url", default="http://127.0.0.1:8765")
+    worker.add_argument("--worker-id", default=None, help="워커 이름 (기본값: PC 이름-프로세스 번호)")
+    worker.add_argument("--shared-output", default=None, help="결과 PDF를 모을 공유 폴더 (기본값: config의 shared_output 또는 output)")
+    worker.add_argument("--heartbeat", type=float, default=10, help="heartbeat 간격(초), 코디네이터의 --lease-seconds보다 짧아야 함")
+    worker.add_argument("--stall-timeout", type=float, default=300,
+                        help="이 시간(초) 동안 Day 진행이 없으면 heartbeat를 멈춰 임대를 반납 (기본값 300)")
+    worker.add_argument("--exit-when-idle", action="store_true", help="대기 중인 작업이 없으면 종료")
+    worker.add_argument("--simulate", type=int, default=0, metavar="N",
+                        help="실제 창 대신 N개의 가상 FactoryVoca 창 사용")
+    worker.add_argument("--speed", type=float, default=1.0, help="가상 창의 시간 압축 배율")
+    worker.set_defaults(func=run_worker_command)
+
+    book = subparsers.add_parser("book", help="병합본(인덱스 파일 필요)에서 Day 뽑기/바꾸기")
+    book_actions = book.add_subparsers(dest="action", required=True)
+    extract = book_actions.add_parser("extract", help="일부 Day만 새 PDF로 뽑기")
+    extract.add_argument("book", help="병합된 PDF")
+    extract.add_argument("--days", required=True, help="Day 범위 (예: 12-15,20)")
+    extract.add_argument("--output", default=None, help="저장할 파일 (기본값: '<병합본> Day <범위>.pdf')")
+    replace = book_actions.add_parser("replace", help="한 Day의 페이지를 다른 PDF로 바꾸기")
+    replace.add_argument("book", help="병합된 PDF")
+    replace.add_argument("--day", type=int, required=True)
+    replace.add_argument("--pdf", required=True, help="새 Day PDF")
+    replace.add_argument("--kind", default=None, choices=list(MergedBook.KIND_LABELS),
+                         help="한 병합본에 시험지와 답지가 같이 있을 때 바꿀 쪽")
+    book.set_defaults(func=run_book_command)
+
+    tune = subparsers.add_parser("tune", help="이 PC에 맞게 딜레이를 줄이는 보정 (연습용 Day 범위를 반복 출력)")
+    tune.add_argument("--day-start", type=int, default=1)
+    tune.add_argument("--day-end", type=int, default=3)
+    tune.add_argument("--trials", type=int, default=3, help="딜레이 값마다 연속으로 성공해야 하는 횟수")
+    tune.add_argument("--steps", type=int, default=5, help="딜레이마다 이분 탐색 횟수")
+    tune.add_argument("--margin", type=float, default=1.2, help="찾은 최솟값에 곱할 안전 여유")
+    tune.add_argument("--delays", default=None, help="보정할 딜레이 (쉼표 구분, 기본값: 전부)")
+    tune.add_argument("--output", default=None, help="저장할 프로파일 (기본값: delay_profiles/<PC 이름>.json)")
+    tune.add_argument("--simulate", type=int, default=0, metavar="N",
+                      help="실제 창 대신 가상 FactoryVoca 창 사용")
+    tune.add_argument("--speed", type=float, default=1.0, help="가상 창의 시간 압축 배율")
+    tune.add_argument("--latency", type=float, default=0.0,
+                      help="가상 창이 불러오기/출력 버튼 뒤 입력을 받지 않는 시간(초)")
+    tune.set_defaults(func=run_tune_command)
+
+    soak = subparsers.add_parser("soak", help="긴 실행에서 메모리/핸들/Day 소요 시간 등이 꾸준히 늘어나는지 측정")
+    add_job_arguments(soak)
+    soak.add_argument("--rounds", type=int, default=1, help="같은 Day 범위를 반복할 횟수")
+    soak.add_argument("--every", type=int, default=25, help="표본을 남길 Day 간격")
+    soak.add_argument("--threshold", type=float, default=0.1, help="실행 동안 이 비율 넘게 늘면 표시 (기본값 0.1)")
+    soak.add_argument("--output", default=None, help="표본 CSV (기본값: soak/<시각>.csv)")
+    soak.add_argument("--gui", action="store_true", help="메인 창과 디버그 창을 띄운 채 실행 (UI 자원과 로그 줄 수까지 측정)")
+    soak.add_argument("--simulate", type=int, default=0, metavar="N",
+                      help="실제 창 대신 가상 FactoryVoca 창 사용")
+    soak.add_argument("--speed", type=float, default=1.0, help="가상 창의 시간 압축 배율")
+    soak.add_argument("--latency", type=float, default=0.0,
+                      help="가상 창이 불러오기/출력 버튼 뒤 입력을 받지 않는 시간(초)")
+    soak.set_defaults(func=run_soak_command)
+    return parser
 
 # 메인 코드 실행
 if __name__ == "__main__":
+    args = build_arg_parser().parse_args()
+    if args.command:
+        Config.load()  # 설정 파일 로드
+        raise SystemExit(args.func(args))
+
     root = tk.Tk()  # Tkinter 메인 윈도우 생성
     Config.load()  # 설정 파일 로드
         
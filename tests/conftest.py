@@ -0,0 +1,9 @@
+import os
+import sys
+
+# main.py는 저장소 루트의 단일 파일이므로 테스트에서 바로 import할 수 있게 경로 추가
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
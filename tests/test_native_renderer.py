@@ -0,0 +1,256 @@
+"""직접 출력 엔진(NativeRenderer) 테스트: 단어 순서의 결정성과 Day PDF 내용/구조"""
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+from PyPDF2 import PdfReader
+
+import main
+from conftest import FIXTURES, ROOT
+from main import WordbookType, build_wordbook_pdf, load_wordbook_source, order_words, render_day_pdfs
+
+
+@pytest.fixture(scope="module")
+def words():
+    return load_wordbook_source(os.path.join(FIXTURES, "wordbook.csv"))
+
+
+def page_cells(path):
+    """PDF 쪽마다 [(글꼴, x, y, 텍스트), ...] (PyPDF2는 UniKS-UCS2-H 한글을 추출하지 못해 직접 읽음)"""
+    pattern = re.compile(r"BT /(F\d) 11 Tf (\d+) (\d+) Td (?:\((.*?)\)|<([0-9a-f]*)>) Tj ET")
+    pages = []
+    for page in PdfReader(path).pages:
+        cells = []
+        for font, x, y, literal, hexed in pattern.findall(page.get_contents().get_data().decode("ascii")):
+            text = bytes.fromhex(hexed).decode("utf-16-be") if font == "F2" else literal
+            cells.append((font, int(x), int(y), text))
+        pages.append(cells)
+    return pages
+
+
+def page_texts(path):
+    return ["\n".join(text for _, _, _, text in cells) for cells in page_cells(path)]
+
+
+def word_sequence(text, candidates):
+    """text에 나오는 순서대로 candidates(영단어) 목록 (나오지 않는 단어는 뺌)"""
+    positions = {}
+    for word in candidates:
+        match = re.search(r"(?<![A-Za-z])" + re.escape(word) + r"(?![A-Za-z])", text)
+        if match:
+            positions[word] = match.start()
+    return sorted(positions, key=positions.get)
+
+
+def load_gui_samples():
+    """fixtures/gui/samples.json에 등록된 FactoryVoca 출력 PDF
+
+    항목: {"pdf": "파일 이름", "source": "단어장 자료 파일", "day": 1, "type": "원래순서"}.
+    FactoryVoca에서 출력한 Day PDF를 fixtures/gui에 넣고 여기에 등록하면 직접 출력과 비교한다.
+    """
+    with open(os.path.join(FIXTURES, "gui", "samples.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("sample", [s for s in load_gui_samples() if s["type"] == WordbookType.ORIGINAL.value]
+                         or [pytest.param(None, marks=pytest.mark.skip(reason="등록된 FactoryVoca 출력 샘플이 없습니다"))])
+def test_original_matches_gui_sample(sample):
+    # 원래순서는 FactoryVoca 출력과 문제 순서(영단어)가 같아야 한다
+    source = load_wordbook_source(os.path.join(FIXTURES, sample["source"]))[sample["day"]]
+    gui_text = "\n".join(page.extract_text() for page in PdfReader(os.path.join(FIXTURES, "gui", sample["pdf"])).pages)
+    native = [english for english, _ in order_words(source, WordbookType.ORIGINAL, None, sample["day"])]
+    gui = word_sequence(gui_text, native)
+    assert gui == [english for english in native if english in gui]
+    assert len(gui) == len(native)
+
+
+def test_word_sequence_reads_another_writer(words):
+    # 비교 도구 자체 확인: 다른 방식으로 쓴 PDF(build_text_pdf)에서도 순서를 읽는다
+    lines = [f"{number}. {english}" for number, (english, _) in enumerate(words[2], 1)]
+    pdf = PdfReader(io.BytesIO(main.build_text_pdf([lines])))
+    assert word_sequence(pdf.pages[0].extract_text(), [e for e, _ in words[2]]) == [e for e, _ in words[2]]
+
+
+@pytest.mark.parametrize("wordbook_type, engine, tagged", [
+    (WordbookType.RANDOM, "native", True),
+    (WordbookType.ENG_KOR_RANDOM, "native", True),
+    (WordbookType.ORIGINAL, "native", False),
+    (WordbookType.RANDOM, "gui", False),
+])
+def test_native_random_output_is_tagged(wordbook_type, engine, tagged):
+    # 직접 출력한 랜덤 순서는 FactoryVoca와 다르므로 같은 버전의 GUI 출력과 이름이 달라야 한다
+    macro = SimpleNamespace(input_values={"name": "책", "type": wordbook_type, "version": "3"})
+    with main.Config.override({"engine": engine, "native_renderer": {"source": "wordbook.csv"}}):
+        filename = main.MacroController.get_filename(macro, 4)
+    assert (main.NativeRenderer.TAG in filename) == tagged
+    assert filename.endswith("Day 4")
+
+
+def test_csv_and_json_sources_match(words):
+    assert load_wordbook_source(os.path.join(FIXTURES, "wordbook.json")) == words
+    assert sorted(words) == [1, 2]
+    assert len(words[1]) == 36
+    assert words[2][0] == ("borrow", "빌리다")
+
+
+@pytest.mark.parametrize("wordbook_type", list(WordbookType))
+def test_order_is_deterministic_per_type_version_day(words, wordbook_type):
+    first = order_words(words[1], wordbook_type, "1", 1)
+    assert order_words(words[1], wordbook_type, "1", 1) == first
+    assert sorted(tuple(sorted(pair)) for pair in first) == sorted(tuple(sorted(pair)) for pair in words[1])
+
+
+def test_original_keeps_source_order(words):
+    assert order_words(words[1], WordbookType.ORIGINAL, "1", 1) == words[1]
+    assert order_words(words[1], WordbookType.ORIGINAL, "1", 1, word_count=5) == words[1][:5]
+
+
+def test_random_order_depends_on_version_and_day(words):
+    base = order_words(words[1], WordbookType.RANDOM, "1", 1)
+    assert base != words[1]
+    assert order_words(words[1], WordbookType.RANDOM, "2", 1) != base
+    assert order_words(words[1], WordbookType.RANDOM, "1", 2) != base
+
+
+def test_random_order_is_pinned(words):
+    # 다른 PC에서 만든 같은 버전과 순서가 같아야 하므로 결과를 고정해 둔다
+    assert [english for english, _ in order_words(words[2], WordbookType.RANDOM, "1", 2)] == [
+        "carry", "borrow", "explain", "follow", "decide", "gather"]
+
+
+def test_random_order_is_same_in_another_process(words):
+    # 문자열 해시 시드가 달라도 순서가 같아야 한다 (프로세스 풀/다른 PC)
+    script = (
+        "import main\n"
+        f"words = main.load_wordbook_source({os.path.join(FIXTURES, 'wordbook.csv')!r})\n"
+        "print([q for q, _ in main.order_words(words[1], main.WordbookType.ENG_KOR_RANDOM, '3', 1)])\n"
+    )
+    env = dict(os.environ, PYTHONHASHSEED="12345")
+    output = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    expected = [q for q, _ in order_words(words[1], WordbookType.ENG_KOR_RANDOM, "3", 1)]
+    assert output.strip() == repr(expected)
+
+
+def test_eng_kor_ratio_and_word_count(words):
+    english = {english for english, _ in words[1]}
+    questions = order_words(words[1], WordbookType.ENG_KOR_RANDOM, "1", 1, word_count=20, eng_kor_ratio=0.25)
+    assert len(questions) == 20
+    assert sum(prompt in english for prompt, _ in questions) == 5
+    assert all((prompt in english) != (answer in english) for prompt, answer in questions)
+
+
+def test_render_day_pdfs_structure_and_text(words, tmp_path):
+    questions = order_words(words[1], WordbookType.ORIGINAL, "1", 1)
+    test_path = str(tmp_path / "test.pdf")
+    answer_path = str(tmp_path / "answer.pdf")
+
+    assert render_day_pdfs(1, "시험 원래순서", "Unit 1", questions, False, test_path, answer_path) == 1
+
+    # 한 쪽에 34문제이므로 36문제는 2쪽
+    test_pages = page_texts(test_path)
+    answer_pages = page_texts(answer_path)
+    assert len(test_pages) == len(answer_pages) == 2
+    for text in test_pages + answer_pages:
+        assert "Day 01" in text
+        assert "Unit 1" in text
+        assert "시험 원래순서" in text
+    assert "1." in test_pages[0] and "34." in test_pages[0]
+    assert "35." in test_pages[1] and "kettle" in test_pages[1]
+    # 시험지에는 정답이 없고 답지에는 있다
+    assert "사과" not in test_pages[0]
+    assert "______________" in test_pages[0]
+    assert "사과" in answer_pages[0] and "주전자" in answer_pages[1]
+
+    # 머리글 두 줄과 빈 줄 다음에 번호/문제/빈칸 칸이 20pt 간격으로 놓인다
+    cells = page_cells(answer_path)[0]
+    assert cells[:3] == [("F1", 50, 800, "Day 01"), ("F1", 120, 800, "Unit 1"), ("F2", 50, 780, "시험 원래순서")]
+    assert cells[3:6] == [("F1", 50, 740, "1."), ("F1", 80, 740, "apple"), ("F2", 320, 740, "사과")]
+    assert len(cells) == 3 + 34 * 3
+
+
+def test_render_day_pdfs_first_letter(words, tmp_path):
+    questions = order_words(words[2], WordbookType.ORIGINAL, "1", 2)
+    test_path = str(tmp_path / "test.pdf")
+    render_day_pdfs(2, "제목", None, questions, True, test_path, str(tmp_path / "answer.pdf"))
+    text = page_texts(test_path)[0]
+    assert "Day 02" in text
+    assert "빌 ____________" in text
+
+
+def test_non_bmp_text_is_replaced(tmp_path):
+    path = tmp_path / "emoji.pdf"
+    path.write_bytes(build_wordbook_pdf([[[(50, "사과 \U0001F34E")]]]))
+    assert page_cells(str(path))[0] == [("F2", 50, 800, "사과 ?")]
+
+
+def test_run_stops_and_cleans_up_on_worker_error(tmp_path, monkeypatch):
+    work_folder = tmp_path / "work"
+    staging_root = tmp_path / "staging"
+    work_folder.mkdir()
+    staging_root.mkdir()
+
+    class Recorder:
+        def __init__(self):
+            self.logs = []
+            self.cleaned = None
+            self.finished = []
+            self.directories = {"Staging": str(staging_root)}
+            self.history = self
+            self.metrics = self
+            self.pdf_manager = self
+
+        def log(self, message):
+            self.logs.append(message)
+
+        def select_staging_root(self, day_count):
+            pass
+
+        def start_job(self, input_values):
+            return 1
+
+        def finish_job(self, job_id, status):
+            self.finished.append(status)
+
+        def inc(self, name):
+            pass
+
+        def cleanup_folders(self, staging_folder=None, work_files=None):
+            self.cleaned = (staging_folder, work_files)
+
+    class Macro:
+        window = None
+        record_history = True
+        input_values = {"type": WordbookType.ORIGINAL, "version": None}
+        stopped = None
+
+        def get_filename(self, day=None):
+            return "시험" if day is None else f"시험 Day {day}"
+
+        def get_work_folder(self):
+            return str(work_folder)
+
+        def stop_macro(self, reason=None):
+            self.stopped = reason
+
+    controller = Recorder()
+    macro = Macro()
+    monkeypatch.setattr(main.NativeRenderer, "get_settings", staticmethod(lambda: {
+        "source": os.path.join(FIXTURES, "wordbook.csv"), "workers": 1}))
+    monkeypatch.setattr(main, "ProcessPoolExecutor", main.ThreadPoolExecutor)
+
+    def failing_render(*args):
+        raise OSError("disk full")
+    monkeypatch.setattr(main, "render_day_pdfs", failing_render)
+
+    assert main.NativeRenderer(controller).run(macro, 1, 2) is None
+    assert "disk full" in macro.stopped
+    assert controller.finished == ["stopped"]
+    staging_folder, work_files = controller.cleaned
+    assert os.path.dirname(staging_folder) == str(staging_root)
+    assert sorted(work_files) == [1, 2]